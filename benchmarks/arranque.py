@@ -0,0 +1,55 @@
+"""
+Mide el tiempo de arranque en frío (intérprete nuevo) de los puntos de entrada:
+importar src.main (lo que precede al trabajo de `python -m src.main`), importar
+src.automatizador y ejecutar el script del dashboard con el AppTest de Streamlit.
+También comprueba que importar los módulos no cree archivos (p. ej. logs/).
+
+Uso: python benchmarks/arranque.py [--repeticiones N]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parents[1]
+
+CASOS = {
+    "python -m src.main (import)": "import src.main",
+    "automatizador (import)": "import src.automatizador",
+    "dashboard (primer render)": (
+        "from streamlit.testing.v1 import AppTest;"
+        f"AppTest.from_file({str(RAIZ / 'dashboard' / 'app_dashboard.py')!r}, default_timeout=120).run()"
+    ),
+}
+
+
+def medir(codigo, repeticiones):
+    """Mediana (ms) de ejecutar `codigo` en un intérprete nuevo y si dejó archivos en el cwd."""
+    tiempos = []
+    efectos = set()
+    entorno = {**os.environ, "PYTHONPATH": str(RAIZ)}
+
+    for _ in range(repeticiones):
+        with tempfile.TemporaryDirectory() as cwd:
+            inicio = time.perf_counter()
+            subprocess.run([sys.executable, "-c", codigo], cwd=cwd, env=entorno, check=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+            efectos.update(os.listdir(cwd))
+
+    return statistics.median(tiempos), sorted(efectos)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'Punto de entrada':<32}{'Mediana (ms)':>14}  Archivos creados")
+    for nombre, codigo in CASOS.items():
+        mediana, efectos = medir(codigo, args.repeticiones)
+        print(f"{nombre:<32}{mediana:>14.1f}  {', '.join(efectos) or '—'}")
@@ -0,0 +1,56 @@
+"""
+Mide la memoria por ciudad de los resultados en memoria: dicts anidados (esquema JSON)
+frente a los registros de src.modelos, usando tracemalloc sobre un snapshot de /data
+replicado hasta N ciudades.
+
+Uso: python benchmarks/memoria_resultados.py [--ciudades N] [--archivo RUTA]
+"""
+import sys
+import json
+import argparse
+import tracemalloc
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(RAIZ))
+
+from src.modelos import ResultadoCiudad  # noqa: E402
+from dashboard.utils_dashboard import list_json_results, pick_latest_file, load_run  # noqa: E402
+
+
+def medir(construir):
+    """Bytes retenidos por lo que devuelve `construir()`."""
+    tracemalloc.start()
+    inicio, _ = tracemalloc.get_traced_memory()
+    objeto = construir()
+    fin, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return fin - inicio, objeto
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--ciudades", type=int, default=10000)
+    parser.add_argument("--archivo", type=Path, default=None)
+    args = parser.parse_args()
+
+    ruta = args.archivo or pick_latest_file(list_json_results())
+    base = [r for r in load_run(ruta)[0] if r.get("clima")]
+    if not base:
+        sys.exit(f"❌ {ruta} no tiene resultados con clima para replicar.")
+
+    # Cada réplica se decodifica por separado (objetos independientes, como al procesar
+    # ciudades distintas); en los registros los dicts intermedios se liberan al convertir
+    textos = [
+        json.dumps(dict(base[i % len(base)], ciudad=f"Ciudad {i}"), ensure_ascii=False)
+        for i in range(args.ciudades)
+    ]
+
+    bytes_dicts, _ = medir(lambda: [json.loads(t) for t in textos])
+    bytes_registros, _ = medir(lambda: [ResultadoCiudad.desde_dict(json.loads(t)) for t in textos])
+
+    print(f"Archivo: {ruta.name} · {args.ciudades} ciudades")
+    print(f"{'Representación':<22}{'Bytes/ciudad':>14}")
+    print(f"{'dicts anidados':<22}{bytes_dicts / args.ciudades:>14.0f}")
+    print(f"{'registros (slots)':<22}{bytes_registros / args.ciudades:>14.0f}")
+    print(f"Reducción: {1 - bytes_registros / bytes_dicts:.0%}")
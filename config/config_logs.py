@@ -3,9 +3,8 @@ import sys
 from pathlib import Path
 from logging.handlers import RotatingFileHandler
 
-# --- Crear carpeta de logs si no existe ---
+# --- Carpeta de logs (se crea al configurar los loggers, no al importar) ---
 LOG_DIR = Path("logs")
-LOG_DIR.mkdir(exist_ok=True)
 
 # --- Formatos de logging ---
 LOG_FORMAT = "%(asctime)s [%(levelname)s] %(message)s"
@@ -24,6 +23,8 @@ def configurar_logs_generales():
     - también imprime todo en consola
     """
 
+    LOG_DIR.mkdir(exist_ok=True)
+
     # Eliminar handlers previos del root logger
     for handler in logging.root.handlers[:]:
         logging.root.removeHandler(handler)
@@ -69,6 +70,8 @@ def configurar_logger_automatizacion():
     Guarda sus registros en logs/automatizacion.log y también muestra en consola.
     También reenvía errores al archivo global error.log.
     """
+    LOG_DIR.mkdir(exist_ok=True)
+
     logger = logging.getLogger("automatizador")
     logger.setLevel(logging.INFO)
     logger.propagate = False  # Evita duplicados en el logger raíz
@@ -1,9 +1,10 @@
 import streamlit as st
-import plotly.express as px
-import pandas as pd
 from pathlib import Path
 from typing import List, Dict
-from utils_dashboard import list_json_results, pick_latest_file, load_json
+from utils_dashboard import (
+    list_json_results, pick_latest_file, load_run, tasas_usd, pronostico_columnas,
+    load_horario
+)
 
 st.set_page_config(
     page_title="TravelCorp Dashboard",
@@ -18,9 +19,42 @@ st.title("🌍 TravelCorp Dashboard de Monitoreo de Viajes")
 def cached_list_files() -> List[Path]:
     return list_json_results()
 
-@st.cache_data(show_spinner=True)
-def cached_load_json(path: Path) -> List[Dict]:
-    return load_json(path)
+@st.cache_resource(show_spinner=True, max_entries=8)
+def cached_vista(path: Path, mtime: float) -> Dict:
+    """
+    Carga una ejecución y precalcula sus vistas (vistas_dashboard) una sola vez por archivo.
+    Se guarda como recurso (sin copiar en cada rerun): las vistas se tratan como solo lectura.
+    """
+    from vistas_dashboard import construir_vista
+
+    data, metadata = load_run(path)
+    vista = construir_vista(data, metadata)
+    vista["metadata"] = metadata
+    vista["tasas"] = tasas_usd(data)
+    vista["base"] = next(
+        (c["finanzas"].get("moneda_base", "USD") for c in data if isinstance(c, dict) and c.get("finanzas")),
+        "USD"
+    )
+    return vista
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def cached_resumen_base(path: Path, mtime: float, base: str):
+    """Tabla de métricas en la moneda base elegida, calculada una vez por (archivo, base)."""
+    from vistas_dashboard import resumen_en_base
+
+    vista = cached_vista(path, mtime)
+    return resumen_en_base(vista["resumen"], base, vista["tasas"], base == vista["base"])
+
+@st.cache_resource(show_spinner=True, max_entries=16)
+def cached_comparacion(path_antes: Path, mtime_antes: float, path_ahora: Path, mtime_ahora: float) -> Dict:
+    """Comparación de dos ejecuciones, calculada una vez por par de archivos (vistas_dashboard)."""
+    from vistas_dashboard import comparar_vistas
+
+    return comparar_vistas(cached_vista(path_antes, mtime_antes), cached_vista(path_ahora, mtime_ahora))
+
+@st.cache_data(show_spinner=False)
+def cached_load_horario(id_ejecucion: str, ciudad: str, paso_horas: int) -> Dict[str, List]:
+    return load_horario(id_ejecucion, ciudad, paso_horas)
 
 
 # ---------- UI de carga ----------
@@ -52,6 +86,16 @@ if selected_path is None:
     st.error("No se pudo determinar el archivo más reciente.")
     st.stop()
 
+# Modo comparación: otra ejecución contra la seleccionada
+SIN_COMPARACION = "(sin comparación)"
+opcion_comparar = st.sidebar.selectbox(
+    "🔀 Comparar con",
+    options=[SIN_COMPARACION] + [p.name for p in reversed(files) if p != selected_path],
+    index=0,
+    help="Muestra los cambios por ciudad (IVV, tipo de cambio, temperatura y alertas) entre dos ejecuciones."
+)
+path_comparar = next((p for p in files if p.name == opcion_comparar), None)
+
 # ------------------------------------------------------------
 # 📅 Mostrar información legible del registro cargado
 # ------------------------------------------------------------
@@ -76,21 +120,42 @@ st.subheader(formatear_nombre_archivo(selected_path.name))
 
 # ---------- Cargar datos ----------
 try:
-    data = cached_load_json(selected_path)
-except ValueError as e:
+    mtime_archivo = selected_path.stat().st_mtime
+    vista = cached_vista(selected_path, mtime_archivo)
+except (ValueError, OSError) as e:
     st.error(f"Error al cargar el archivo: {e}")
     st.stop()
+metadata = vista["metadata"]
+
+# pandas y plotly se importan solo cuando ya hay datos que mostrar (arranque más rápido)
+import pandas as pd
+import plotly.express as px
+from vistas_dashboard import filtrar, paginar, agregar_mapa, COLORES_RIESGO, NIVELES_RIESGO
+
+# Tamaños de página de las tablas y umbral a partir del cual el mapa agrega por celdas
+TAMANOS_PAGINA = [25, 50, 100, 250]
+ALERTAS_POR_PAGINA = 20
+UMBRAL_PUNTOS_MAPA = 1000
+
+
+def selector_pagina(total_filas: int, tamano: int, clave: str) -> int:
+    """Selector de página (desde 1) con el total de páginas y filas."""
+    total_paginas = max(1, -(-total_filas // tamano))
+    col_pag, col_info = st.columns([1, 3])
+    pagina = col_pag.number_input("Página", min_value=1, max_value=total_paginas, value=1, step=1, key=clave)
+    col_info.caption(f"{total_filas} filas · página {pagina} de {total_paginas}")
+    return int(pagina)
+
+# Ciudades que cambiaron respecto a la ejecución anterior (solo en archivos con metadata)
+cambiadas = set(metadata.get("cambiadas", []))
+if "cambiadas" in metadata:
+    st.caption(
+        f"🔄 {len(cambiadas)} de {len(vista['ciudades'])} ciudades cambiaron respecto a la ejecución anterior "
+        f"(snapshot {metadata.get('tipo', 'completo')})."
+    )
 
-# Validación mínima de esquema esperado (campos clave por ciudad)
-required_city_keys = {"ciudad", "componentes_ivv", "clima", "finanzas", "tiempo", "alertas"}
-missing = []
-for i, item in enumerate(data):
-    if not isinstance(item, dict):
-        missing.append((i, "no es un dict"))
-        continue
-    faltantes = required_city_keys - set(item.keys())
-    if faltantes:
-        missing.append((i, f"faltan claves: {', '.join(sorted(faltantes))}"))
+# Validación mínima de esquema esperado (hecha al escribir el archivo, o al cargarlo si es antiguo)
+missing = vista["faltantes"]
 
 if missing:
     st.warning(
@@ -101,6 +166,73 @@ if missing:
         for idx, msg in missing[:20]:
             st.write(f"• Elemento {idx}: {msg}")
 
+# ------------------------------------------------------------
+#  Comparación entre dos ejecuciones
+# ------------------------------------------------------------
+@st.fragment
+def seccion_comparacion():
+    # "Antes" es siempre la ejecución más antigua del par (el nombre lleva la fecha)
+    path_antes, path_ahora = sorted([selected_path, path_comparar], key=lambda p: p.name)
+    try:
+        comparacion = cached_comparacion(path_antes, path_antes.stat().st_mtime, path_ahora, path_ahora.stat().st_mtime)
+    except (ValueError, OSError) as e:
+        st.error(f"No se pudo comparar con {path_comparar.name}: {e}")
+        return
+
+    st.markdown(
+        f"**Antes:** {formatear_nombre_archivo(path_antes.name)} · **Ahora:** {formatear_nombre_archivo(path_ahora.name)}"
+    )
+    conteo, conteo_alertas = comparacion["conteo"], comparacion["conteo_alertas"]
+    cols = st.columns(6)
+    cols[0].metric("🔴 Empeoraron", conteo.get("empeoró", 0))
+    cols[1].metric("🟢 Mejoraron", conteo.get("mejoró", 0))
+    cols[2].metric("🆕 Ciudades nuevas", conteo.get("nueva", 0))
+    cols[3].metric("➖ Eliminadas", conteo.get("eliminada", 0))
+    cols[4].metric("⚠️ Alertas nuevas", conteo_alertas.get("nueva", 0))
+    cols[5].metric("✅ Alertas resueltas", conteo_alertas.get("resuelta", 0))
+
+    col_cambio, col_ciudad, col_tamano = st.columns([2, 2, 1])
+    cambios = col_cambio.multiselect(
+        "Tipo de cambio", options=["empeoró", "mejoró", "nueva", "eliminada", "sin datos", "igual"], key="comparar_cambio"
+    )
+    texto = col_ciudad.text_input("Buscar ciudad", key="comparar_ciudad")
+    tamano = col_tamano.selectbox("Filas por página", options=TAMANOS_PAGINA, key="comparar_tamano")
+
+    df_filtrado = filtrar(comparacion["tabla"], {"Cambio": cambios}, texto)
+    pagina = selector_pagina(len(df_filtrado), tamano, "comparar_pagina")
+    df_pagina, _ = paginar(df_filtrado, pagina, tamano)
+    st.dataframe(df_pagina.style.format(precision=2, na_rep="—"), use_container_width=True, hide_index=True)
+
+    df_alertas_cambio = filtrar(comparacion["alertas"], texto=texto)
+    if not df_alertas_cambio.empty:
+        with st.expander(f"Cambios en alertas ({len(df_alertas_cambio)})"):
+            pagina_alertas = selector_pagina(len(df_alertas_cambio), tamano, "comparar_alertas_pagina")
+            st.dataframe(
+                paginar(df_alertas_cambio, pagina_alertas, tamano)[0],
+                use_container_width=True,
+                hide_index=True
+            )
+
+
+if path_comparar is not None:
+    st.divider()
+    st.subheader("🔀 Comparación de ejecuciones")
+    seccion_comparacion()
+
+# ---------- Moneda base ----------
+# Los cruces con otra base se calculan desde las tasas USD del propio snapshot
+tasas_snapshot = vista["tasas"]
+base_snapshot = vista["base"]
+monedas_base = sorted(set(tasas_snapshot) | {base_snapshot})
+moneda_base = st.sidebar.selectbox(
+    "💱 Moneda base",
+    options=monedas_base,
+    index=monedas_base.index(base_snapshot),
+    help="Moneda en la que se expresan los tipos de cambio. La variación y la tendencia "
+         "solo están disponibles para la base con la que se generó el registro."
+)
+misma_base = moneda_base == base_snapshot
+
 
 # ------------------------------------------------------------
 #  Resumen general de métricas por ciudad
@@ -108,50 +240,31 @@ if missing:
 st.divider()
 st.subheader("🌆 Resumen general de métricas por ciudad")
 
-# Extraer métricas relevantes de cada ciudad
-filas = []
-for c in data:
-    ciudad = c.get("ciudad", "—")
-    clima = c.get("clima", {})
-    fin = c.get("finanzas", {})
-    ivv = c.get("ivv_score")
-    nivel = c.get("nivel_riesgo", "DESCONOCIDO")
-    color = c.get("color", "#6c757d")
-
-    filas.append({
-        "Ciudad": ciudad,
-        "Temperatura (°C)": clima.get("temperatura_actual", "—"),
-        "Viento (km/h)": clima.get("viento", "—"),
-        "UV": clima.get("uv", "—"),
-        "Precipitación (%)": clima.get("precipitacion", "—"),
-        "Tipo de cambio": fin.get("tipo_cambio_actual", "—"),
-        "Variación diaria (%)": fin.get("variacion_diaria", "—"),
-        "Tendencia": fin.get("tendencia_5_dias", "—"),
-        "IVV Score": ivv if ivv is not None else "—",
-        "Nivel de riesgo": nivel,
-        "color": color
-    })
+# Tabla precalculada por (archivo, moneda base); el color del nivel de riesgo ya viene en "estilo"
+df_resumen = cached_resumen_base(selected_path, mtime_archivo, moneda_base)
 
 
-df_resumen = pd.DataFrame(filas)
+# Fragmento: filtrar o cambiar de página solo vuelve a dibujar la tabla.
+# Se filtra y pagina aquí; al navegador solo llega (y solo se estiliza) la página visible.
+@st.fragment
+def seccion_resumen():
+    if df_resumen.empty:
+        st.info("No se encontraron datos para generar la tabla resumen.")
+        return
 
-if df_resumen.empty:
-    st.info("No se encontraron datos para generar la tabla resumen.")
-else:
-    # Crear copia sin columna de color (solo para estilo)
-    df_vista = df_resumen.drop(columns=["color"])
+    col_nivel, col_ciudad, col_tamano = st.columns([2, 2, 1])
+    niveles = col_nivel.multiselect("Nivel de riesgo", options=NIVELES_RIESGO, key="resumen_niveles")
+    texto = col_ciudad.text_input("Buscar ciudad", key="resumen_ciudad")
+    tamano = col_tamano.selectbox("Filas por página", options=TAMANOS_PAGINA, key="resumen_tamano")
 
-    # Aplicar estilo de color por nivel de riesgo
+    df_filtrado = filtrar(df_resumen, {"Nivel de riesgo": niveles}, texto)
+    pagina = selector_pagina(len(df_filtrado), tamano, "resumen_pagina")
+    df_pagina, _ = paginar(df_filtrado, pagina, tamano)
+
+    estilos = df_pagina["estilo"].tolist()
     styled_df = (
-        df_vista.style
-        .apply(
-            lambda s: [
-                f"background-color: {df_resumen.loc[i, 'color']}; color: white; text-align:center;"
-                if s.name == "Nivel de riesgo" else ""
-                for i in s.index
-            ],
-            axis=0
-        )
+        df_pagina.drop(columns=["estilo"]).style
+        .apply(lambda s: estilos, subset=["Nivel de riesgo"])
         .format(precision=2, na_rep="—")
     )
 
@@ -161,87 +274,112 @@ else:
         hide_index=True
     )
 
+
+seccion_resumen()
+
 # ------------------------------------------------------------
 #  Gráfico de temperatura (pronóstico 7 días)
 # ------------------------------------------------------------
-st.markdown("### 🌤️ Pronóstico de temperatura (7 días)")
-
-# Crear selector de ciudad integrado en esta sección
-ciudades_disponibles = [c["ciudad"] for c in data if "ciudad" in c]
-if not ciudades_disponibles:
-    st.warning("No hay ciudades disponibles para mostrar el pronóstico.")
-else:
-    col_sel1, col_sel2 = st.columns([1.5, 3])
-    with col_sel1:
-        ciudad_seleccionada = st.selectbox(
-            "Selecciona una ciudad:",
-            options=ciudades_disponibles,
-            index=0,
-            help="Cambia la ciudad para actualizar el pronóstico de temperatura."
-        )
-
-    # Filtrar datos de la ciudad seleccionada
-    ciudad_data = next((c for c in data if c["ciudad"] == ciudad_seleccionada), None)
-    clima = ciudad_data.get("clima", {}) if ciudad_data else {}
-    pronostico = clima.get("pronostico_7_dias", [])
-
-    if pronostico and isinstance(pronostico, list):
-        # Crear DataFrame
-        df_temp = pd.DataFrame(pronostico)
-
-        # Asegurar formato correcto
-        if {"fecha", "temp_max", "temp_min"} <= set(df_temp.columns):
-            df_temp["fecha"] = pd.to_datetime(df_temp["fecha"], errors="coerce")
-
-            fig_temp = px.line(
-                df_temp,
-                x="fecha",
-                y=["temp_max", "temp_min"],
-                labels={"value": "Temperatura (°C)", "variable": "Medición"},
-                title=f"Tendencia de temperatura – {ciudad_seleccionada}",
-                markers=True
-            )
-
-            fig_temp.update_layout(
-                legend_title_text="Tipo",
-                hovermode="x unified",
-                xaxis_title="Fecha",
-                yaxis_title="Temperatura (°C)",
-                template="plotly_white",
-                height=400
+# Fragmento: cambiar de ciudad o de agrupación horaria solo vuelve a dibujar esta sección
+@st.fragment
+def seccion_pronostico():
+    st.markdown("### 🌤️ Pronóstico de temperatura (7 días)")
+
+    # Crear selector de ciudad integrado en esta sección
+    ciudades_disponibles = vista["ciudades"]
+    if not ciudades_disponibles:
+        st.warning("No hay ciudades disponibles para mostrar el pronóstico.")
+    else:
+        col_sel1, col_sel2 = st.columns([1.5, 3])
+        with col_sel1:
+            ciudad_seleccionada = st.selectbox(
+                "Selecciona una ciudad:",
+                options=ciudades_disponibles,
+                index=0,
+                help="Cambia la ciudad para actualizar el pronóstico de temperatura."
             )
 
-            st.plotly_chart(fig_temp, use_container_width=True)
+        # Filtrar datos de la ciudad seleccionada
+        ciudad_data = vista["por_ciudad"].get(ciudad_seleccionada)
+        clima = ciudad_data.get("clima", {}) if ciudad_data else {}
+        pronostico = pronostico_columnas(clima.get("pronostico_7_dias"))
+
+        if pronostico.get("fecha"):
+            # Crear DataFrame directamente desde las columnas
+            df_temp = pd.DataFrame(pronostico)
+
+            # Asegurar formato correcto
+            if {"fecha", "temp_max", "temp_min"} <= set(df_temp.columns):
+                df_temp["fecha"] = pd.to_datetime(df_temp["fecha"], errors="coerce")
+
+                fig_temp = px.line(
+                    df_temp,
+                    x="fecha",
+                    y=["temp_max", "temp_min"],
+                    labels={"value": "Temperatura (°C)", "variable": "Medición"},
+                    title=f"Tendencia de temperatura – {ciudad_seleccionada}",
+                    markers=True
+                )
+
+                fig_temp.update_layout(
+                    legend_title_text="Tipo",
+                    hovermode="x unified",
+                    xaxis_title="Fecha",
+                    yaxis_title="Temperatura (°C)",
+                    template="plotly_white",
+                    height=400
+                )
+
+                st.plotly_chart(fig_temp, use_container_width=True)
+            else:
+                st.warning("Los datos de pronóstico no tienen el formato esperado (fecha, temp_max, temp_min).")
         else:
-            st.warning("Los datos de pronóstico no tienen el formato esperado (fecha, temp_max, temp_min).")
-    else:
-        st.info("No se encontraron datos de pronóstico de temperatura para esta ciudad.")
+            st.info("No se encontraron datos de pronóstico de temperatura para esta ciudad.")
+
+        # Series horarias (solo si la ejecución las guardó): se leen por ciudad y ya reducidas
+        if metadata.get("horario"):
+            paso_horas = st.select_slider(
+                "Agrupar pronóstico horario cada (horas):",
+                options=[1, 3, 6, 12],
+                value=3,
+                help="Cada punto muestra el máximo del bloque de horas."
+            )
+            horario = cached_load_horario(metadata["horario"], ciudad_seleccionada, paso_horas)
+
+            if horario.get("hora"):
+                df_horario = pd.DataFrame(horario)
+                df_horario["hora"] = pd.to_datetime(df_horario["hora"], errors="coerce")
+                fig_horario = px.line(
+                    df_horario,
+                    x="hora",
+                    y=[c for c in df_horario.columns if c != "hora"],
+                    labels={"value": "Valor máximo", "variable": "Variable"},
+                    title=f"Pronóstico horario (máximo cada {paso_horas} h) – {ciudad_seleccionada}"
+                )
+                fig_horario.update_layout(hovermode="x unified", template="plotly_white", height=350)
+                st.plotly_chart(fig_horario, use_container_width=True)
+            else:
+                st.info("No hay pronóstico horario guardado para esta ciudad.")
+
+
+seccion_pronostico()
 
 # ------------------------------------------------------------
 #  Comparativo general de tipo de cambio por ciudad
 # ------------------------------------------------------------
-st.markdown("### 💱 Comparativo general de tipo de cambio actual (USD → moneda local)")
-
-# Crear lista de datos agregados de todas las ciudades
-ciudades = []
-tipos_cambio = []
-variaciones = []
-
-for entry in data:
-    nombre = entry.get("ciudad")
-    fin = entry.get("finanzas", {})
-    if fin and "tipo_cambio_actual" in fin:
-        ciudades.append(nombre)
-        tipos_cambio.append(fin["tipo_cambio_actual"])
-        variaciones.append(fin.get("variacion_diaria", 0))
-
-if not ciudades:
+st.markdown(f"### 💱 Comparativo general de tipo de cambio actual ({moneda_base} → moneda local)")
+
+# Ciudades con tipo de cambio disponible en la base elegida (de la tabla ya calculada)
+columna_cambio = f"Tipo de cambio ({moneda_base})"
+df_cambio = df_resumen.dropna(subset=[columna_cambio]) if not df_resumen.empty else df_resumen
+
+if df_cambio.empty:
     st.info("No hay datos de tipo de cambio disponibles para generar el comparativo.")
 else:
     df_comparativo = pd.DataFrame({
-        "Ciudad": ciudades,
-        "Tipo de cambio": tipos_cambio,
-        "Variación (%)": variaciones
+        "Ciudad": df_cambio["Ciudad"],
+        "Tipo de cambio": df_cambio[columna_cambio],
+        "Variación (%)": df_cambio["Variación diaria (%)"].fillna(0) if misma_base else 0
     })
 
     # Crear gráfico de barras horizontales
@@ -253,7 +391,7 @@ else:
         color="Variación (%)",
         color_continuous_scale="RdYlGn",
         text="Tipo de cambio",
-        title="Tipo de cambio actual por ciudad (USD → moneda local)"
+        title=f"Tipo de cambio actual por ciudad ({moneda_base} → moneda local)"
     )
 
     fig_bar.update_traces(
@@ -278,42 +416,47 @@ else:
 st.divider()
 st.markdown("### ⚠️ Resumen general de alertas")
 
-# Recolectar todas las alertas del JSON
-todas_alertas = []
-for c in data:
-    ciudad = c.get("ciudad", "—")
-    for alerta in c.get("alertas", []):
-        alerta["ciudad"] = ciudad
-        todas_alertas.append(alerta)
+# Transiciones de esta ejecución (motor de alertas con estado)
+transiciones = vista["transiciones"]
+if transiciones is not None:
+    conteo = vista["conteo_transiciones"]
+    col_t1, col_t2, col_t3 = st.columns(3)
+    col_t1.metric("🆕 Nuevas", conteo["nueva"])
+    col_t2.metric("⬆️ Escaladas", conteo["escalada"])
+    col_t3.metric("✅ Resueltas", conteo["resuelta"])
 
-if not todas_alertas:
-    st.success("✅ No hay alertas activas en ninguna ciudad.")
-else:
-    # Ordenar por severidad (ALTA > MEDIA > BAJA)
-    orden_severidad = {"ALTA": 3, "MEDIA": 2, "BAJA": 1}
-    todas_alertas = sorted(
-        todas_alertas,
-        key=lambda a: orden_severidad.get(a.get("severidad", "BAJA"),0),
-        reverse=True
-    )
+    resueltas = vista["resueltas"]
+    if resueltas:
+        with st.expander(f"Alertas resueltas en esta ejecución ({len(resueltas)})"):
+            for tr in resueltas:
+                st.write(f"• 🌆 {tr['ciudad']} — {tr['tipo']}: {tr['mensaje']} (activa desde {tr['primera_vez']} hasta {tr.get('ultima_vez') or 'la ejecución anterior'})")
+
+# Alertas ya ordenadas por severidad (ALTA > MEDIA > BAJA) y con color, ícono y etiqueta
+df_alertas = vista["alertas"]
 
-    # Mostrar alertas agrupadas por ciudad
-    for alerta in todas_alertas:
-        tipo = alerta.get("tipo", "DESCONOCIDO")
-        severidad = alerta.get("severidad", "BAJA").upper()
-        mensaje = alerta.get("mensaje", "Sin descripción")
-        ciudad = alerta.get("ciudad", "—")
-
-        # Definir color e ícono según severidad
-        if severidad == "ALTA":
-            color = "#dc3545"  # rojo
-            icono = "🚨"
-        elif severidad == "MEDIA":
-            color = "#fd7e14"  # naranja
-            icono = "⚠️"
-        else:
-            color = "#ffc107"  # amarillo
-            icono = "ℹ️"
+
+# Fragmento: se filtra por severidad, tipo y ciudad y solo se dibuja la página visible
+@st.fragment
+def seccion_alertas():
+    if df_alertas.empty:
+        st.success("✅ No hay alertas activas en ninguna ciudad.")
+        return
+
+    col_sev, col_tipo, col_ciudad = st.columns(3)
+    severidades = col_sev.multiselect("Severidad", options=["ALTA", "MEDIA", "BAJA"], key="alertas_severidad")
+    tipos = col_tipo.multiselect("Tipo", options=sorted(df_alertas["tipo"].unique()), key="alertas_tipo")
+    texto = col_ciudad.text_input("Buscar ciudad", key="alertas_ciudad")
+
+    df_filtrado = filtrar(df_alertas, {"severidad": severidades, "tipo": tipos}, texto, columna_texto="ciudad")
+    if df_filtrado.empty:
+        st.info("Ninguna alerta coincide con los filtros.")
+        return
+
+    pagina = selector_pagina(len(df_filtrado), ALERTAS_POR_PAGINA, "alertas_pagina")
+    df_pagina, _ = paginar(df_filtrado, pagina, ALERTAS_POR_PAGINA)
+
+    for alerta in df_pagina.itertuples(index=False):
+        color = alerta.color
 
         # Contenedor visual con información de ciudad
         st.markdown(
@@ -323,89 +466,102 @@ else:
                         padding:0.7em 1em;
                         margin-bottom:0.6em;
                         border-radius:8px'>
-                <b style='color:{color}; font-size:1.05em;'>{icono} {tipo} — {severidad}</b>
-                <span style='float:right; color:#555;'>🌆 {ciudad}</span><br>
-                <span style='color:#333;'>{mensaje}</span>
+                <b style='color:{color}; font-size:1.05em;'>{alerta.icono} {alerta.tipo} — {alerta.severidad}{alerta.etiqueta}</b>
+                <span style='float:right; color:#555;'>🌆 {alerta.ciudad}</span><br>
+                <span style='color:#333;'>{alerta.mensaje}</span>
             </div>
             """,
             unsafe_allow_html=True
         )
 
 
+seccion_alertas()
+
+
 # ------------------------------------------------------------
 # Mapa general de ciudades por nivel de riesgo
 # ------------------------------------------------------------
 st.divider()
 st.markdown("### 🌍 Mapa general de riesgo (IVV por ciudad)")
 
-# Crear DataFrame con todas las ciudades y sus coordenadas + riesgo
-ciudades_mapa = []
-for c in data:
-    info_ivv = c.get("componentes_ivv", {})
-    clima = c.get("clima", {})
-    ciudad_conf = next(
-        (conf for conf in data if conf.get("ciudad") == c["ciudad"]), None
-    )
+# Puntos del mapa precalculados (coordenadas ya resueltas por ciudad)
+df_mapa = vista["mapa"]
 
-    ciudades_mapa.append({
-        "ciudad": c.get("ciudad"),
-        "ivv_score": c.get("ivv_score"),
-        "nivel_riesgo": c.get("nivel_riesgo", "DESCONOCIDO"),
-        "color": c.get("color", "#6c757d"),
-    })
 
-# Si las coordenadas no están incluidas en el JSON, las obtendremos desde config.json
-# Cargar config si no hay coordenadas en los datos
-if all(c.get("lat") is None for c in ciudades_mapa):
-    from pathlib import Path
-    import json
-    ruta_config = Path(__file__).parent.parent / "config" / "config.json"
-    with open(ruta_config, "r", encoding="utf-8") as f:
-        config_data = json.load(f)
-    coords = {c["nombre"]: (c["lat"], c["lon"]) for c in config_data["ciudades"]}
-
-    for c in ciudades_mapa:
-        if c["ciudad"] in coords:
-            c["lat"], c["lon"] = coords[c["ciudad"]]
-
-# Filtrar las ciudades con coordenadas válidas
-df_mapa = pd.DataFrame([c for c in ciudades_mapa if c["lat"] is not None and c["lon"] is not None])
-
-if df_mapa.empty:
-    st.info("No se pudieron determinar coordenadas para generar el mapa.")
-else:
-    # Convertir colores hex a categoría según nivel
-    color_map = {
-        "BAJO": "#28a745",
-        "MEDIO": "#ffc107",
-        "ALTO": "#fd7e14",
-        "CRITICO": "#dc3545",
-        "DESCONOCIDO": "#6c757d"
-    }
-
-    df_mapa["color"] = df_mapa["nivel_riesgo"].map(color_map).fillna("#6c757d")
-
-    fig_map = px.scatter_mapbox(
-        df_mapa,
-        lat="lat",
-        lon="lon",
-        size="ivv_score",
-        color="nivel_riesgo",
-        color_discrete_map=color_map,
-        hover_name="ciudad",
-        hover_data={
-            "nivel_riesgo": True,
-            "ivv_score": True,
-            "lat": False,
-            "lon": False
-        },
-        zoom=1,
-        height=500,
-        title="Mapa mundial de riesgo (IVV por ciudad)"
+def figura_mapa(df: pd.DataFrame, **kwargs):
+    """
+    Mapa de dispersión con MapLibre (px.scatter_map, WebGL) si la versión de plotly lo trae;
+    si no, con px.scatter_mapbox.
+    """
+    if hasattr(px, "scatter_map"):
+        return px.scatter_map(df, map_style="carto-positron", **kwargs)
+    fig = px.scatter_mapbox(df, **kwargs)
+    fig.update_layout(mapbox_style="carto-positron")
+    return fig
+
+
+# Fragmento: cambiar el modo o la resolución del mapa no recalcula el resto de la página
+@st.fragment
+def seccion_mapa():
+    if df_mapa.empty:
+        st.info("No se pudieron determinar coordenadas para generar el mapa.")
+        return
+
+    col_modo, col_res = st.columns([2, 1])
+    modo = col_modo.radio(
+        "Modo del mapa",
+        options=["Automático", "Por ciudad", "Agregado por celdas"],
+        horizontal=True,
+        help=f"En automático se agregan las ciudades por celdas a partir de {UMBRAL_PUNTOS_MAPA} ciudades."
     )
+    agregado = modo == "Agregado por celdas" or (modo == "Automático" and len(df_mapa) > UMBRAL_PUNTOS_MAPA)
+
+    if agregado:
+        resolucion = col_res.select_slider("Tamaño de celda (grados)", options=[0.5, 1, 2, 5, 10], value=5)
+        df_celdas = agregar_mapa(df_mapa, resolucion)
+        fig_map = figura_mapa(
+            df_celdas,
+            lat="lat",
+            lon="lon",
+            size="ciudades",
+            color="nivel_riesgo",
+            color_discrete_map=COLORES_RIESGO,
+            hover_name="ejemplo",
+            hover_data={
+                "ciudades": True,
+                "ivv_promedio": True,
+                "detalle": True,
+                "nivel_riesgo": False,
+                "lat": False,
+                "lon": False
+            },
+            zoom=1,
+            height=500,
+            title=f"Mapa mundial de riesgo ({len(df_mapa)} ciudades en {len(df_celdas)} celdas de {resolucion}°, color = peor nivel)"
+        )
+    else:
+        # Sin IVV (nivel DESCONOCIDO) se dibuja con un tamaño fijo para que siga visible
+        fig_map = figura_mapa(
+            df_mapa.assign(tamano=df_mapa["ivv_score"].fillna(20)),
+            lat="lat",
+            lon="lon",
+            size="tamano",
+            color="nivel_riesgo",
+            color_discrete_map=COLORES_RIESGO,
+            hover_name="ciudad",
+            hover_data={
+                "nivel_riesgo": True,
+                "ivv_score": True,
+                "tamano": False,
+                "lat": False,
+                "lon": False
+            },
+            zoom=1,
+            height=500,
+            title="Mapa mundial de riesgo (IVV por ciudad)"
+        )
 
     fig_map.update_layout(
-        mapbox_style="carto-positron",  # Alternativas: "open-street-map", "stamen-terrain", "white-bg"
         margin=dict(l=0, r=0, t=40, b=0),
         coloraxis_showscale=False,
         legend=dict(
@@ -419,3 +575,6 @@ else:
     )
 
     st.plotly_chart(fig_map, use_container_width=True)
+
+
+seccion_mapa()
@@ -2,6 +2,7 @@ from pathlib import Path
 import json
 from typing import List, Dict, Optional, Tuple
 import datetime as dt
+from functools import lru_cache
 
 # Patrón de archivo esperado: resultado_general_YYYYMMDD_HHMMSS.json
 FILENAME_PREFIX = "resultado_general_"
@@ -53,20 +54,140 @@ def pick_latest_file(paths: List[Path]) -> Optional[Path]:
     return sorted(paths, key=sort_key, reverse=True)[0]
 
 
-def load_json(path: Path) -> List[Dict]:
+def load_snapshot(path: Path) -> Dict:
     """
-    Carga un JSON de resultados (lista de ciudades).
+    Carga un archivo de resultados tal como está guardado: {"metadata": ..., "resultados": [...]}.
+    Los archivos antiguos (solo la lista de ciudades) se tratan como snapshots completos.
     Lanza ValueError con mensaje claro si hay problema.
     """
     try:
         with path.open("r", encoding="utf-8") as f:
             data = json.load(f)
-        if not isinstance(data, list):
+        if isinstance(data, list):
+            return {"metadata": {"tipo": "completo"}, "resultados": data}
+        if not isinstance(data, dict) or not isinstance(data.get("resultados"), list):
             raise ValueError("El archivo no contiene una lista de resultados por ciudad.")
         return data
     except json.JSONDecodeError as e:
         raise ValueError(f"JSON inválido en {path.name}: {e}") from e
     except FileNotFoundError:
         raise ValueError(f"No se encontró el archivo: {path}")
+    except ValueError:
+        raise
     except Exception as e:
         raise ValueError(f"Error al leer {path.name}: {e}") from e
+
+
+@lru_cache(maxsize=32)
+def _reconstruir(ruta: str, mtime: float) -> Tuple[List[Dict], Dict]:
+    """
+    Reconstruye la lista completa de ciudades de una ejecución. Un delta se resuelve sobre
+    la ejecución anterior (también en caché), así que cada paso solo aplica sus cambios.
+    `mtime` forma parte de la clave para invalidar la caché si el archivo se reescribe.
+    """
+    path = Path(ruta)
+    snapshot = load_snapshot(path)
+    metadata = snapshot["metadata"]
+
+    if metadata.get("tipo") != "delta":
+        return snapshot["resultados"], metadata
+
+    anterior = path.parent / metadata["anterior"]
+    if not anterior.exists():
+        raise ValueError(
+            f"No se encontró {metadata['anterior']}, necesario para reconstruir el delta {path.name}"
+        )
+
+    previos, _ = _reconstruir(str(anterior), anterior.stat().st_mtime)
+    por_ciudad = {c["ciudad"]: c for c in previos if isinstance(c, dict) and "ciudad" in c}
+    por_ciudad.update({c["ciudad"]: c for c in snapshot["resultados"]})
+
+    resultados = [por_ciudad[ciudad] for ciudad in metadata["ciudades"] if ciudad in por_ciudad]
+    return resultados, metadata
+
+
+def load_run(path: Path) -> Tuple[List[Dict], Dict]:
+    """
+    Carga una ejecución completa (lista de ciudades) y su metadata, reconstruyendo
+    los snapshots delta a partir de su snapshot completo base.
+    """
+    try:
+        mtime = path.stat().st_mtime
+    except FileNotFoundError:
+        raise ValueError(f"No se encontró el archivo: {path}")
+
+    resultados, metadata = _reconstruir(str(path.resolve()), mtime)
+    return list(resultados), metadata
+
+
+def load_json(path: Path) -> List[Dict]:
+    """
+    Carga un JSON de resultados (lista de ciudades), reconstruyéndolo si es un delta.
+    Lanza ValueError con mensaje claro si hay problema.
+    """
+    return load_run(path)[0]
+
+
+def tasas_usd(data: List[Dict]) -> Dict[str, float]:
+    """
+    Tasas USD → moneda presentes en el snapshot (campo `tasa_usd` de cada ciudad).
+    Con ellas se recalcula cualquier cruce base → moneda sin volver a consultar la API.
+    """
+    tasas = {"USD": 1.0}
+    for item in data:
+        fin = item.get("finanzas") or {}
+        if fin.get("moneda") and fin.get("tasa_usd"):
+            tasas[fin["moneda"]] = fin["tasa_usd"]
+    return tasas
+
+
+def pronostico_columnas(pronostico) -> Dict[str, List]:
+    """
+    Pronóstico de una ciudad como columnas {"fecha": [...], "temp_max": [...], ...}.
+    Los snapshots con clima.formato_pronostico = "columnas" ya vienen así y se usan tal cual;
+    los que guardan una fila por día se transponen.
+    """
+    if isinstance(pronostico, dict):
+        return pronostico
+    if not pronostico or not isinstance(pronostico, list):
+        return {}
+
+    nombres = list(pronostico[0])
+    return {nombre: [fila.get(nombre) for fila in pronostico] for nombre in nombres}
+
+
+def load_horario(id_ejecucion: str, ciudad: str, paso_horas: int = 1) -> Dict[str, List]:
+    """
+    Serie horaria de una ciudad guardada por src.horario en /data/horario/<id_ejecucion>/,
+    reducida a bloques de `paso_horas` (máximo de cada bloque, el valor relevante para
+    lluvia y viento). Solo lee del binario el tramo de esa ciudad.
+    Retorna {"hora": [...], variable: [...]} o {} si la ejecución o la ciudad no tienen serie.
+    """
+    import numpy as np
+
+    directorio = _data_dir() / "horario" / id_ejecucion
+    for ruta_indice in sorted(directorio.glob("*_indice.json")):
+        with ruta_indice.open("r", encoding="utf-8") as f:
+            indice = json.load(f)
+        entrada = indice["ciudades"].get(ciudad)
+        if entrada is not None:
+            break
+    else:
+        return {}
+
+    paso = max(1, int(paso_horas))
+    n, bloques = entrada["n"], -(-entrada["n"] // paso)
+    inicio = dt.datetime.fromisoformat(entrada["inicio"])
+    columnas = {"hora": [(inicio + dt.timedelta(hours=i * paso)).isoformat() for i in range(bloques)]}
+
+    for variable in indice["variables"]:
+        valores = np.fromfile(
+            directorio / f"{indice['parte']}_{variable}.f32", dtype=np.float32,
+            count=n, offset=entrada["offset"] * 4
+        )
+        relleno = np.full(bloques * paso, np.nan, dtype=np.float32)
+        relleno[:len(valores)] = valores
+        maximos = np.fmax.reduce(relleno.reshape(bloques, paso), axis=1)
+        columnas[variable] = [None if np.isnan(v) else round(float(v), 2) for v in maximos]
+
+    return columnas
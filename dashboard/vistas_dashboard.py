@@ -0,0 +1,344 @@
+import json
+from pathlib import Path
+from typing import List, Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Vistas precalculadas del dashboard: se construyen una vez por archivo de resultados
+# (y por moneda base) y cada rerun de Streamlit solo las dibuja.
+
+CAMPOS_REQUERIDOS = {"ciudad", "componentes_ivv", "clima", "finanzas", "tiempo", "alertas"}
+
+# Regla de las alertas guardadas antes de que existiera el campo "regla", por el texto
+# de su mensaje sin el valor entre paréntesis (ver src.procesar_ciudades.evaluar_alertas)
+REGLA_POR_MENSAJE = {
+    "Temperatura extrema": "temperatura_extrema",
+    "Alta probabilidad de lluvia": "lluvia",
+    "Viento fuerte": "viento",
+    "Variación de tipo de cambio > 3%": "variacion_cambio",
+    "Tendencia negativa en el tipo de cambio": "tendencia_negativa",
+}
+
+ORDEN_SEVERIDAD = {"ALTA": 3, "MEDIA": 2, "BAJA": 1}
+ESTILO_SEVERIDAD = {
+    "ALTA": ("#dc3545", "🚨"),   # rojo
+    "MEDIA": ("#fd7e14", "⚠️"),  # naranja
+    "BAJA": ("#ffc107", "ℹ️"),   # amarillo
+}
+ETIQUETA_TRANSICION = {"nueva": " · 🆕 NUEVA", "escalada": " · ⬆️ ESCALADA"}
+
+# Del peor al mejor nivel: en el mapa agregado cada celda toma el peor nivel de sus ciudades
+NIVELES_RIESGO = ["CRITICO", "ALTO", "MEDIO", "BAJO", "DESCONOCIDO"]
+
+COLORES_RIESGO = {
+    "BAJO": "#28a745",
+    "MEDIO": "#ffc107",
+    "ALTO": "#fd7e14",
+    "CRITICO": "#dc3545",
+    "DESCONOCIDO": "#6c757d"
+}
+
+
+def validar_esquema(data: List[Dict]) -> List[Tuple[int, str]]:
+    """Elementos que no cumplen el esquema mínimo por ciudad: [(índice, motivo), ...]."""
+    faltantes = []
+    for i, item in enumerate(data):
+        if not isinstance(item, dict):
+            faltantes.append((i, "no es un dict"))
+            continue
+        claves = CAMPOS_REQUERIDOS - set(item.keys())
+        if claves:
+            faltantes.append((i, f"faltan claves: {', '.join(sorted(claves))}"))
+    return faltantes
+
+
+def _coordenadas_config() -> Dict[str, Tuple[float, float]]:
+    """Coordenadas por ciudad desde config.json (para archivos que no las traen)."""
+    ruta_config = Path(__file__).parent.parent / "config" / "config.json"
+    try:
+        with open(ruta_config, "r", encoding="utf-8") as f:
+            return {c["nombre"]: (c["lat"], c["lon"]) for c in json.load(f)["ciudades"]}
+    except (OSError, KeyError, ValueError):
+        return {}
+
+
+def construir_vista(data: List[Dict], metadata: Dict) -> Dict:
+    """
+    Precalcula en una sola pasada lo que cada sección del dashboard necesita:
+    validación de esquema, índice por ciudad, tabla de métricas (sin las columnas que
+    dependen de la moneda base), alertas ordenadas, transiciones y puntos del mapa.
+    """
+    ciudades = [c for c in data if isinstance(c, dict) and "ciudad" in c]
+    cambiadas = set(metadata.get("cambiadas", []))
+    transiciones = metadata.get("transiciones_alertas")
+
+    estado_alerta = {
+        (tr["ciudad"], tr["tipo"], tr.get("regla")): tr["transicion"]
+        for tr in (transiciones or []) if tr["transicion"] != "resuelta"
+    }
+
+    filas, alertas, mapa = [], [], []
+    for c in ciudades:
+        clima = c.get("clima") or {}
+        fin = c.get("finanzas") or {}
+        nivel = c.get("nivel_riesgo", "DESCONOCIDO")
+        color = c.get("color", "#6c757d")
+
+        filas.append({
+            "Ciudad": c["ciudad"],
+            "Temperatura (°C)": clima.get("temperatura_actual"),
+            "Viento (km/h)": clima.get("viento"),
+            "UV": clima.get("uv"),
+            "Precipitación (%)": clima.get("precipitacion"),
+            "IVV Score": c.get("ivv_score"),
+            "Nivel de riesgo": nivel,
+            "Cambió": "🔄" if c["ciudad"] in cambiadas else "",
+            "estilo": f"background-color: {color}; color: white; text-align:center;",
+            "moneda": fin.get("moneda"),
+            "moneda_base": fin.get("moneda_base", "USD") if fin else None,
+            "tipo_cambio_actual": fin.get("tipo_cambio_actual"),
+            "tasa_usd": fin.get("tasa_usd"),
+            "variacion_diaria": fin.get("variacion_diaria"),
+            "tendencia": fin.get("tendencia_5_dias")
+        })
+
+        for alerta in c.get("alertas", []):
+            severidad = alerta.get("severidad", "BAJA").upper()
+            color_alerta, icono = ESTILO_SEVERIDAD.get(severidad, ESTILO_SEVERIDAD["BAJA"])
+            transicion = estado_alerta.get((c["ciudad"], alerta.get("tipo"), alerta.get("regla")))
+            alertas.append({
+                "ciudad": c["ciudad"],
+                "tipo": alerta.get("tipo", "DESCONOCIDO"),
+                "regla": alerta.get("regla"),
+                "severidad": severidad,
+                "mensaje": alerta.get("mensaje", "Sin descripción"),
+                "orden": ORDEN_SEVERIDAD.get(severidad, 0),
+                "color": color_alerta,
+                "icono": icono,
+                "etiqueta": ETIQUETA_TRANSICION.get(transicion, "")
+            })
+
+        mapa.append({
+            "ciudad": c["ciudad"],
+            "ivv_score": c.get("ivv_score"),
+            "nivel_riesgo": nivel,
+            "lat": c.get("lat"),
+            "lon": c.get("lon")
+        })
+
+    # Coordenadas: vienen en el resultado de cada ciudad; los archivos anteriores a ese
+    # campo las toman de config.json (un dict, no un scan por ciudad)
+    if mapa and all(m["lat"] is None for m in mapa):
+        coords = _coordenadas_config()
+        for m in mapa:
+            m["lat"], m["lon"] = coords.get(m["ciudad"], (None, None))
+
+    df_alertas = pd.DataFrame(alertas)
+    if not df_alertas.empty:
+        df_alertas = df_alertas.sort_values("orden", ascending=False, kind="stable").reset_index(drop=True)
+
+    df_mapa = pd.DataFrame(mapa).dropna(subset=["lat", "lon"]) if mapa else pd.DataFrame()
+    if not df_mapa.empty:
+        df_mapa["color"] = df_mapa["nivel_riesgo"].map(COLORES_RIESGO).fillna("#6c757d")
+
+    conteo = {
+        t: sum(1 for tr in (transiciones or []) if tr["transicion"] == t)
+        for t in ("nueva", "escalada", "resuelta")
+    }
+
+    # Si el flujo ya validó la ejecución completa al escribirla (src.esquema exige al menos
+    # CAMPOS_REQUERIDOS), no se repite por ciudad; los archivos anteriores sí se validan aquí
+    validacion = metadata.get("validacion") or {}
+
+    return {
+        "faltantes": [] if validacion.get("valido") else validar_esquema(data),
+        "por_ciudad": {c["ciudad"]: c for c in ciudades},
+        "ciudades": [c["ciudad"] for c in ciudades],
+        "resumen": pd.DataFrame(filas),
+        "alertas": df_alertas,
+        "mapa": df_mapa,
+        "transiciones": transiciones,
+        "conteo_transiciones": conteo,
+        "resueltas": [tr for tr in (transiciones or []) if tr["transicion"] == "resuelta"]
+    }
+
+
+def redondear_significativas(serie: pd.Series, cifras: int = 6) -> pd.Series:
+    """Redondea a `cifras` cifras significativas (no decimales), para tasas muy pequeñas o muy grandes."""
+    valores = serie.astype(float)
+    distintos_de_cero = valores.where(valores != 0)
+    factor = 10.0 ** (cifras - 1 - np.floor(np.log10(distintos_de_cero.abs())))
+    return ((valores * factor).round() / factor).where(valores != 0, valores)
+
+
+def resumen_en_base(resumen: pd.DataFrame, base: str, tasas: Dict[str, float], misma_base: bool) -> pd.DataFrame:
+    """
+    Tabla de métricas lista para mostrar con los tipos de cambio expresados en `base`,
+    calculados en bloque: el valor guardado si el snapshot ya usa esa base; si no, el cruce con `tasas`.
+    Conserva la columna "estilo" para colorear el nivel de riesgo.
+    """
+    if resumen.empty:
+        return resumen
+
+    tasa_base = tasas.get(base)
+    cruce = resumen["moneda"].map(tasas) / tasa_base if tasa_base else pd.Series(float("nan"), index=resumen.index)
+    tipo_cambio = redondear_significativas(resumen["tipo_cambio_actual"].where(resumen["moneda_base"] == base, cruce))
+
+    vista = resumen[["Ciudad", "Temperatura (°C)", "Viento (km/h)", "UV", "Precipitación (%)"]].copy()
+    vista[f"Tipo de cambio ({base})"] = tipo_cambio
+    vista["Variación diaria (%)"] = resumen["variacion_diaria"] if misma_base else None
+    vista["Tendencia"] = resumen["tendencia"] if misma_base else None
+    vista[["IVV Score", "Nivel de riesgo", "Cambió", "estilo"]] = resumen[["IVV Score", "Nivel de riesgo", "Cambió", "estilo"]]
+    return vista
+
+
+def filtrar(df: pd.DataFrame, filtros: Dict[str, List] = None, texto: str = "", columna_texto: str = "Ciudad") -> pd.DataFrame:
+    """
+    Filtra una vista antes de dibujarla: `filtros` = {columna: valores permitidos}
+    (una lista vacía no filtra) y `texto` busca en `columna_texto` sin distinguir mayúsculas.
+    """
+    if df.empty:
+        return df
+
+    mascara = pd.Series(True, index=df.index)
+    for columna, valores in (filtros or {}).items():
+        if valores:
+            mascara &= df[columna].isin(valores)
+    if texto:
+        mascara &= df[columna_texto].astype(str).str.contains(texto, case=False, regex=False)
+    return df[mascara]
+
+
+def paginar(df: pd.DataFrame, pagina: int, tamano: int) -> Tuple[pd.DataFrame, int]:
+    """Página `pagina` (desde 1) de `tamano` filas y el total de páginas."""
+    total = max(1, -(-len(df) // tamano))
+    pagina = min(max(1, pagina), total)
+    return df.iloc[(pagina - 1) * tamano: pagina * tamano], total
+
+
+def agregar_mapa(df_mapa: pd.DataFrame, resolucion: float) -> pd.DataFrame:
+    """
+    Agrupa los puntos del mapa en celdas de `resolucion` grados: un marcador por celda con
+    el número de ciudades, el IVV promedio, el peor nivel de riesgo y el conteo por nivel.
+    """
+    if df_mapa.empty:
+        return df_mapa
+
+    rango = {nivel: i for i, nivel in enumerate(NIVELES_RIESGO)}
+    df = df_mapa.assign(
+        lat_celda=(df_mapa["lat"] // resolucion) * resolucion + resolucion / 2,
+        lon_celda=(df_mapa["lon"] // resolucion) * resolucion + resolucion / 2,
+        rango=df_mapa["nivel_riesgo"].map(rango).fillna(len(NIVELES_RIESGO) - 1)
+    )
+
+    grupos = df.groupby(["lat_celda", "lon_celda"])
+    celdas = grupos.agg(
+        ciudades=("ciudad", "size"),
+        ivv_promedio=("ivv_score", "mean"),
+        rango=("rango", "min"),
+        ejemplo=("ciudad", "first")
+    ).reset_index()
+
+    conteo = pd.crosstab([df["lat_celda"], df["lon_celda"]], df["nivel_riesgo"])
+    detalle = conteo.apply(
+        lambda fila: " · ".join(f"{nivel}: {n}" for nivel, n in fila.items() if n), axis=1
+    ).rename("detalle").reset_index()
+
+    celdas = celdas.merge(detalle, on=["lat_celda", "lon_celda"], how="left")
+    celdas["nivel_riesgo"] = celdas["rango"].astype(int).map(dict(enumerate(NIVELES_RIESGO)))
+    celdas["ivv_promedio"] = celdas["ivv_promedio"].round(1)
+    return celdas.rename(columns={"lat_celda": "lat", "lon_celda": "lon"}).drop(columns=["rango"])
+
+
+def comparar_vistas(antes: Dict, ahora: Dict) -> Dict:
+    """
+    Compara dos ejecuciones ya cargadas (vistas de construir_vista) uniendo sus tablas por
+    ciudad y sus alertas por (ciudad, tipo, regla) con joins por clave, sin recorridos anidados.
+    Retorna {"tabla": deltas por ciudad, "alertas": alertas que aparecieron, se resolvieron o
+    cambiaron de severidad, "conteo": ciudades por tipo de cambio}.
+    """
+    columnas = ["Ciudad", "Nivel de riesgo", "IVV Score", "Temperatura (°C)",
+                "moneda_base", "tipo_cambio_actual", "tasa_usd"]
+    a = antes["resumen"].reindex(columns=columnas).set_index("Ciudad")
+    b = ahora["resumen"].reindex(columns=columnas).set_index("Ciudad")
+    union = a.join(b, how="outer", lsuffix="_antes", rsuffix="_ahora")
+
+    # Tasa USD → moneda de cada lado (los archivos antiguos sin tasa_usd usan el tipo de cambio si la base era USD)
+    def tasa(lado):
+        actual = union[f"tipo_cambio_actual_{lado}"].where(union[f"moneda_base_{lado}"] == "USD")
+        return union[f"tasa_usd_{lado}"].fillna(actual)
+
+    rango = {nivel: i for i, nivel in enumerate(NIVELES_RIESGO) if nivel != "DESCONOCIDO"}
+    rango_antes = union["Nivel de riesgo_antes"].map(rango)
+    rango_ahora = union["Nivel de riesgo_ahora"].map(rango)
+
+    cambio = pd.Series("igual", index=union.index)
+    cambio[rango_ahora > rango_antes] = "mejoró"
+    cambio[rango_ahora < rango_antes] = "empeoró"
+    cambio[rango_antes.isna() != rango_ahora.isna()] = "sin datos"  # uno de los dos lados es DESCONOCIDO
+    cambio[union["Nivel de riesgo_antes"].isna()] = "nueva"
+    cambio[union["Nivel de riesgo_ahora"].isna()] = "eliminada"
+
+    tabla = pd.DataFrame({
+        "Cambio": cambio,
+        "Nivel antes": union["Nivel de riesgo_antes"],
+        "Nivel ahora": union["Nivel de riesgo_ahora"],
+        "IVV antes": union["IVV Score_antes"],
+        "IVV ahora": union["IVV Score_ahora"],
+        "Δ IVV": (union["IVV Score_ahora"] - union["IVV Score_antes"]).round(2),
+        "Temp. antes (°C)": union["Temperatura (°C)_antes"],
+        "Temp. ahora (°C)": union["Temperatura (°C)_ahora"],
+        "Δ Temp. (°C)": (union["Temperatura (°C)_ahora"] - union["Temperatura (°C)_antes"]).round(2),
+        "Δ tipo de cambio (%)": ((tasa("ahora") / tasa("antes") - 1) * 100).round(3)
+    })
+
+    # --- Alertas: unión por clave con indicador de origen ---
+    columnas_alerta = ["ciudad", "tipo", "regla", "severidad", "mensaje"]
+    claves = ["ciudad", "tipo", "clave"]
+
+    def alertas(vista):
+        df = vista["alertas"].reindex(columns=columnas_alerta)
+        # Las ejecuciones sin "regla" llevan valores en el mensaje ("... (80%)"): se quita el
+        # valor y se traduce el texto a su regla para que coincidan con las ejecuciones nuevas
+        texto = df["mensaje"].fillna("").str.replace(r"\s*\(.*\)\s*$", "", regex=True)
+        return df.assign(clave=df["regla"].fillna(texto.map(REGLA_POR_MENSAJE).fillna(texto)))
+
+    union_alertas = alertas(antes).merge(
+        alertas(ahora), on=claves, how="outer", suffixes=("_antes", "_ahora"), indicator=True
+    )
+    estado = pd.Series("cambió severidad", index=union_alertas.index)
+    estado[union_alertas["_merge"] == "right_only"] = "nueva"
+    estado[union_alertas["_merge"] == "left_only"] = "resuelta"
+    cambiadas = (union_alertas["_merge"] != "both") | (
+        union_alertas["severidad_antes"] != union_alertas["severidad_ahora"]
+    )
+
+    df_alertas = pd.DataFrame({
+        "Ciudad": union_alertas["ciudad"],
+        "Cambio": estado,
+        "Tipo": union_alertas["tipo"],
+        "Severidad antes": union_alertas["severidad_antes"],
+        "Severidad ahora": union_alertas["severidad_ahora"],
+        "Mensaje": union_alertas["mensaje_ahora"].fillna(union_alertas["mensaje_antes"])
+    })[cambiadas].reset_index(drop=True)
+
+    # Alertas nuevas / resueltas por ciudad en la misma tabla de deltas
+    por_ciudad = pd.crosstab(df_alertas["Ciudad"], df_alertas["Cambio"])
+    tabla["Alertas nuevas"] = por_ciudad.get("nueva", pd.Series(dtype=int)).reindex(tabla.index).fillna(0).astype(int)
+    tabla["Alertas resueltas"] = por_ciudad.get("resuelta", pd.Series(dtype=int)).reindex(tabla.index).fillna(0).astype(int)
+
+    tabla = (
+        tabla.rename_axis("Ciudad").reset_index()
+        .assign(orden=lambda df: df["Δ IVV"].abs())
+        .sort_values(["orden"], ascending=False, na_position="first", kind="stable")
+        .drop(columns=["orden"])
+        .reset_index(drop=True)
+    )
+
+    return {
+        "tabla": tabla,
+        "alertas": df_alertas,
+        "conteo": cambio.value_counts().to_dict(),
+        "conteo_alertas": df_alertas["Cambio"].value_counts().to_dict()
+    }
@@ -2,10 +2,44 @@ import requests
 import logging
 from tenacity import retry, stop_after_attempt, wait_fixed
 
+# Resolución por defecto de la celda (grados). Open-Meteo devuelve el mismo pronóstico
+# para coordenadas que caen en la misma celda del modelo (~0.1° ≈ 11 km).
+RESOLUCION_CELDA_DEFECTO = 0.1
+
+
+def clave_celda(lat, lon, resolucion=RESOLUCION_CELDA_DEFECTO):
+    """
+    Ajusta unas coordenadas al centro de su celda en la rejilla de la resolución dada.
+    Con resolución 0 o None no agrupa y retorna las coordenadas originales.
+    """
+    if not resolucion:
+        return (lat, lon)
+    return (
+        round(round(lat / resolucion) * resolucion, 4),
+        round(round(lon / resolucion) * resolucion, 4)
+    )
+
+
+def agrupar_por_celda(ciudades, resolucion=RESOLUCION_CELDA_DEFECTO):
+    """
+    Agrupa las ciudades del config por celda: {(lat, lon): [índice en `ciudades`, ...]}.
+    Se usan posiciones y no nombres para que dos entradas con el mismo nombre no se pisen.
+    """
+    celdas = {}
+    for i, ciudad in enumerate(ciudades):
+        celda = clave_celda(ciudad["lat"], ciudad["lon"], resolucion)
+        celdas.setdefault(celda, []).append(i)
+    return celdas
+
 
 @retry(stop=stop_after_attempt(3), wait=wait_fixed(2))
-def obtener_datos_clima(lat, lon):
-    """Consulta la API de Open-Meteo y retorna los datos relevantes."""
+def obtener_datos_clima(lat, lon, sesion=None, variables_horarias=None):
+    """
+    Consulta la API de Open-Meteo y retorna los datos relevantes.
+    Con una requests.Session se reutilizan las conexiones entre consultas.
+    Las variables horarias (p. ej. precipitation_probability, wind_speed_10m) solo se piden
+    si se indican: llegan en data["hourly"] como columnas, una por variable.
+    """
     url_base = "https://api.open-meteo.com/v1/forecast"
     params = {
         "latitude": lat,
@@ -16,9 +50,11 @@ def obtener_datos_clima(lat, lon):
         # "forecast_days": 7, #Esta por defecto en 7 días.
         "timezone": "auto"
     }  
+    if variables_horarias:
+        params["hourly"] = ",".join(variables_horarias)
 
     try:
-        respuesta = requests.get(url_base, params=params, timeout=10)
+        respuesta = (sesion or requests).get(url_base, params=params, timeout=10)
         respuesta.raise_for_status() 
 
         data = respuesta.json()
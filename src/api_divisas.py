@@ -1,93 +1,135 @@
 import requests
-import random
 import logging
+import datetime
+from collections import deque
 from tenacity import retry, stop_after_attempt, wait_fixed
+from src.modelos import Finanzas
 
+URL_TASAS = "https://open.er-api.com/v6/latest/USD"
 
-@retry(stop=stop_after_attempt(3), wait=wait_fixed(2))
-def obtener_tipo_cambio(moneda_objetivo):
-    """Obtiene el tipo de cambio USD → moneda_objetivo y simula 5 días de histórico."""
-    url_base = "https://open.er-api.com/v6/latest/USD"
 
+@retry(stop=stop_after_attempt(3), wait=wait_fixed(2))
+def obtener_tabla_tasas(sesion=None):
+    """
+    Descarga la tabla completa de tasas (base USD) de ExchangeRate API.
+    Se llama una sola vez por ejecución; las tasas cruzadas se calculan con MatrizCambios.
+    """
     try:
-        respuesta = requests.get(url_base, timeout=10)
+        respuesta = (sesion or requests).get(URL_TASAS, timeout=10)
         respuesta.raise_for_status()
         data = respuesta.json()
-        
+
         if "rates" not in data:
             raise ValueError("Estructura inesperada en respuesta de ExchangeRate API")
 
-        tipo_cambio_actual = data["rates"].get(moneda_objetivo)
+        logging.info(f"Tabla de tipos de cambio obtenida correctamente ({len(data['rates'])} monedas)")
+        return {
+            "base": data.get("base_code", "USD"),
+            "tasas": data["rates"],
+            "actualizacion": data.get("time_last_update_unix")
+        }
+
+    except requests.exceptions.RequestException as e:
+        logging.error(f"Error en conexión con ExchangeRate API: {e}")
+        raise
 
-        if tipo_cambio_actual is None:
-            raise ValueError(f"No se encontró tasa para {moneda_objetivo}")
+    except ValueError as e:
+        logging.error(f"Error en formato de respuesta: {e}")
+        raise
 
-        logging.info(f"Tipo de cambio obtenido correctamente para {moneda_objetivo}")
 
-        # Generar histórico simulado ±2% en los últimos 5 días
-        historico = [tipo_cambio_actual]
-        valor = tipo_cambio_actual
+class MatrizCambios:
+    """
+    Tasas cruzadas entre cualquier par de monedas a partir de una única tabla descargada.
+    Como todas las tasas de la tabla comparten la misma base, tasa(A → B) = tasas[B] / tasas[A]
+    en O(1), sin descargar una tabla por cada moneda base.
+    """
 
-        for _ in range(4):
-            variacion = random.uniform(-0.02, 0.02)  # entre -2% y +2%
-            valor = round(valor * (1 + variacion), 4)
-            historico.append(valor)
-            
+    def __init__(self, tabla):
+        self.base_tabla = tabla["base"]
+        self.tasas = tabla["tasas"]
+        self.actualizacion = tabla.get("actualizacion")
+        self._cruces = {}
 
-        # Calcular variación diaria simulada (último día vs anterior)
-        variacion_diaria = round(((historico[-1] - historico[-2]) / historico[-2]) * 100, 2)
+    def tasa(self, base, destino):
+        """Tipo de cambio base → destino. Lanza ValueError si alguna moneda no está en la tabla."""
+        cruces = self._cruces.get(base)
+        if cruces is not None and destino in cruces:
+            return cruces[destino]
 
-        # --- Tendencia ---
-        tendencia = analizar_tendencia(historico)
+        for moneda in (base, destino):
+            if moneda not in self.tasas:
+                raise ValueError(f"No se encontró tasa para {moneda}")
+        return self.tasas[destino] / self.tasas[base]
 
-        return {
-            # "moneda_objetivo": moneda_objetivo,
-            "tipo_cambio_actual": tipo_cambio_actual,
-            "variacion_diaria": variacion_diaria,
-            "tendencia_5_dias": tendencia["tendencia"],
-            # "historico": historico
-        }
+    def cruces(self, base, monedas):
+        """
+        Calcula en bloque las tasas base → moneda para todas las monedas indicadas y las
+        deja en caché para las consultas posteriores con tasa(). Omite monedas desconocidas.
+        Las tasas no se redondean: con bases débiles (p. ej. IDR → EUR ≈ 5.7e-05) unas pocas
+        cifras decimales borrarían las variaciones reales del histórico.
+        """
+        if base not in self.tasas:
+            raise ValueError(f"No se encontró tasa para la moneda base {base}")
 
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Error en conexión con ExchangeRate API: {e}")
-        raise
+        tasa_base = self.tasas[base]
+        cruces = self._cruces.setdefault(base, {})
+        cruces.update({
+            moneda: self.tasas[moneda] / tasa_base
+            for moneda in set(monedas) if moneda in self.tasas
+        })
+        return cruces
 
+
+def obtener_tipo_cambio(moneda_objetivo, historico=None, matriz=None, moneda_base="USD"):
+    """
+    Obtiene el tipo de cambio moneda_base → moneda_objetivo y lo registra en el histórico local.
+    Si no se pasa una MatrizCambios ya construida, descarga la tabla de tasas.
+    La variación diaria y la tendencia se calculan sobre los puntos reales guardados
+    (src.historico_divisas); sin histórico la variación es 0 y la tendencia estable.
+    """
+    if matriz is None:
+        matriz = MatrizCambios(obtener_tabla_tasas())
+
+    try:
+        tipo_cambio_actual = matriz.tasa(moneda_base, moneda_objetivo)
     except ValueError as e:
         logging.error(f"Error en formato de respuesta o moneda: {e}")
         raise
 
+    logging.info(f"Tipo de cambio obtenido correctamente para {moneda_base} → {moneda_objetivo}")
 
-def analizar_tendencia(historico):
-    """Analiza una lista de valores y determina la tendencia."""
-    direcciones = []
-    for i in range(1, len(historico)):
-        if historico[i] > historico[i - 1]:
-            direcciones.append("up")
-        elif historico[i] < historico[i - 1]:
-            direcciones.append("down")
-        else:
-            direcciones.append("flat")
-
-    # Contadores de rachas
-    max_positiva = max_negativa = count_up = count_down = 0
-
-    for d in direcciones:
-        if d == "up":
-            count_up += 1
-            count_down = 0
-            max_positiva = max(max_positiva, count_up)
-        elif d == "down":
-            count_down += 1
-            count_up = 0
-            max_negativa = max(max_negativa, count_down)
-        else:
-            count_up = count_down = 0
+    finanzas = Finanzas(
+        moneda=moneda_objetivo,
+        moneda_base=moneda_base,
+        tipo_cambio_actual=tipo_cambio_actual,
+        variacion_diaria=0.0,
+        tendencia_5_dias="estable",
+        # Tasa USD → moneda: permite al dashboard recalcular cruces con otra base
+        tasa_usd=matriz.tasa("USD", moneda_objetivo)
+    )
+
+    if historico is not None:
+        # La fecha de actualización de la tabla identifica el punto (una vez al día en la API)
+        fecha = matriz.actualizacion or datetime.datetime.now(datetime.timezone.utc)
+        historico.registrar(moneda_objetivo, tipo_cambio_actual, fecha, moneda_base)
+        resumen = historico.resumen(moneda_objetivo, moneda_base)
+        finanzas.variacion_diaria = resumen["variacion_diaria"]
+        finanzas.tendencia_5_dias = resumen["tendencia"]["tendencia"]
 
-    # Determinar tendencia principal
-    if max_positiva >= 3:
+    return finanzas
+
+
+# Días consecutivos mínimos para considerar una racha como tendencia
+DIAS_RACHA_TENDENCIA = 3
+
+
+def _describir_tendencia(max_positiva, max_negativa, umbral=DIAS_RACHA_TENDENCIA):
+    """Convierte las rachas máximas (subidas/bajadas) en el resultado de tendencia."""
+    if max_positiva >= umbral:
         tendencia = "positiva"
         dias = max_positiva
-    elif max_negativa >= 3:
+    elif max_negativa >= umbral:
         tendencia = "negativa"
         dias = max_negativa
     else:
@@ -102,4 +144,165 @@ def analizar_tendencia(historico):
             if dias > 0
             else "Tendencia estable sin rachas significativas"
         )
-    }
\ No newline at end of file
+    }
+
+
+class SeguidorTendencia:
+    """
+    Seguimiento incremental de rachas de subida/bajada sobre los últimos `ventana` valores.
+
+    Cada valor nuevo se procesa en O(1) amortizado, sin recorrer la serie:
+    - `_rachas` guarda las rachas ("up"/"down") que tocan la ventana, de la más antigua
+      a la más reciente, como [direccion, inicio, fin] en posiciones de cambio.
+    - `_maximos[direccion]` es una cola monótona (longitudes no crecientes) de esas rachas,
+      de modo que el frente es siempre la racha más larga de la ventana. Solo la racha más
+      antigua puede estar recortada por el borde de la ventana y se trata aparte.
+    Da el mismo resultado que analizar_tendencia() sobre los últimos `ventana` valores.
+    """
+
+    def __init__(self, ventana=5, umbral=DIAS_RACHA_TENDENCIA):
+        if ventana < 2:
+            raise ValueError("La ventana de tendencia debe tener al menos 2 valores.")
+        self.ventana = ventana
+        self.umbral = umbral
+        self.ultimo = None
+        self._cambios = 0  # número de cambios (pares de valores consecutivos) vistos
+        self._rachas = deque()
+        self._maximos = {"up": deque(), "down": deque()}
+
+    def _inicio_ventana(self):
+        return self._cambios - (self.ventana - 1)
+
+    def agregar(self, valor):
+        """Incorpora un valor nuevo y actualiza las rachas en O(1) amortizado."""
+        if self.ultimo is None:
+            self.ultimo = valor
+            return
+
+        if valor > self.ultimo:
+            direccion = "up"
+        elif valor < self.ultimo:
+            direccion = "down"
+        else:
+            direccion = None  # sin cambio: corta cualquier racha
+        self.ultimo = valor
+
+        posicion = self._cambios
+        self._cambios += 1
+
+        if direccion is not None:
+            rachas = self._rachas
+            maximos = self._maximos[direccion]
+
+            if rachas and rachas[-1][0] == direccion and rachas[-1][2] == posicion - 1:
+                racha = rachas[-1]
+                racha[2] = posicion
+                maximos.pop()  # la racha creciente siempre es la última de su dirección
+            else:
+                racha = [direccion, posicion, posicion]
+                rachas.append(racha)
+
+            longitud = racha[2] - racha[1] + 1
+            while maximos and maximos[-1][2] - maximos[-1][1] + 1 <= longitud:
+                maximos.pop()
+            maximos.append(racha)
+
+        # Descartar rachas que quedaron completamente fuera de la ventana
+        inicio = self._inicio_ventana()
+        while self._rachas and self._rachas[0][2] < inicio:
+            racha = self._rachas.popleft()
+            maximos = self._maximos[racha[0]]
+            if maximos and maximos[0] is racha:
+                maximos.popleft()
+
+    def racha_maxima(self, direccion):
+        """Racha más larga ("up" o "down") dentro de la ventana actual."""
+        maximos = self._maximos[direccion]
+        if not maximos:
+            return 0
+
+        primera = self._rachas[0]
+        if maximos[0] is not primera:
+            return maximos[0][2] - maximos[0][1] + 1
+
+        # La racha más antigua puede estar recortada por el inicio de la ventana
+        recortada = primera[2] - max(primera[1], self._inicio_ventana()) + 1
+        siguiente = maximos[1][2] - maximos[1][1] + 1 if len(maximos) > 1 else 0
+        return max(recortada, siguiente)
+
+    def resultado(self):
+        """Tendencia actual con el mismo formato que analizar_tendencia()."""
+        return _describir_tendencia(self.racha_maxima("up"), self.racha_maxima("down"), self.umbral)
+
+    def a_dict(self):
+        """Estado serializable (JSON) del seguidor."""
+        return {
+            "ventana": self.ventana,
+            "umbral": self.umbral,
+            "ultimo": self.ultimo,
+            "cambios": self._cambios,
+            "rachas": [list(r) for r in self._rachas]
+        }
+
+    @classmethod
+    def desde_dict(cls, estado):
+        """Reconstruye un seguidor guardado con a_dict()."""
+        seguidor = cls(estado["ventana"], estado.get("umbral", DIAS_RACHA_TENDENCIA))
+        seguidor.ultimo = estado["ultimo"]
+        seguidor._cambios = estado["cambios"]
+
+        for racha in estado["rachas"]:
+            racha = list(racha)
+            seguidor._rachas.append(racha)
+            maximos = seguidor._maximos[racha[0]]
+            longitud = racha[2] - racha[1] + 1
+            while maximos and maximos[-1][2] - maximos[-1][1] + 1 <= longitud:
+                maximos.pop()
+            maximos.append(racha)
+        return seguidor
+
+
+def analizar_tendencia(historico):
+    """Analiza una lista de valores y determina la tendencia."""
+    seguidor = SeguidorTendencia(ventana=max(len(historico), 2))
+    for valor in historico:
+        seguidor.agregar(valor)
+    return seguidor.resultado()
+
+
+def analizar_tendencias_lote(series, ventana=None, umbral=DIAS_RACHA_TENDENCIA):
+    """
+    Evalúa la tendencia de muchas series a la vez de forma vectorizada (numpy).
+    `series` es una matriz (n_series, n_valores); las series más cortas se rellenan con NaN
+    a la izquierda. Con `ventana` solo se consideran los últimos `ventana` valores.
+    Retorna un dict con arrays: max_positiva, max_negativa, tendencia y dias_consecutivos.
+    """
+    import numpy as np
+
+    valores = np.asarray(series, dtype=float)
+    if valores.ndim == 1:
+        valores = valores[np.newaxis, :]
+    if ventana is not None:
+        valores = valores[:, -ventana:]
+
+    cambios = np.diff(valores, axis=1)  # NaN (relleno) no cuenta como subida ni bajada
+
+    def rachas_maximas(mascara):
+        if mascara.shape[1] == 0:
+            return np.zeros(mascara.shape[0], dtype=int)
+        acumulado = np.cumsum(mascara, axis=1)
+        reinicio = np.maximum.accumulate(np.where(mascara, 0, acumulado), axis=1)
+        return (acumulado - reinicio).max(axis=1)
+
+    max_positiva = rachas_maximas(cambios > 0)
+    max_negativa = rachas_maximas(cambios < 0)
+
+    es_positiva = max_positiva >= umbral
+    es_negativa = ~es_positiva & (max_negativa >= umbral)
+
+    return {
+        "max_positiva": max_positiva,
+        "max_negativa": max_negativa,
+        "tendencia": np.select([es_positiva, es_negativa], ["positiva", "negativa"], "estable"),
+        "dias_consecutivos": np.select([es_positiva, es_negativa], [max_positiva, max_negativa], 0)
+    }
@@ -2,21 +2,23 @@ import requests
 import logging
 from tenacity import retry, stop_after_attempt, wait_fixed
 from datetime import datetime
+from src.modelos import Tiempo
 
 
 @retry(stop=stop_after_attempt(3), wait=wait_fixed(2))
-def obtener_zona_horaria(timezone_objetivo):
+def obtener_zona_horaria(timezone_objetivo, sesion=None):
     """ Obtiene la hora local actual y la diferencia con Bogotá usando WorldTimeAPI."""
+    cliente = sesion or requests
     try:
         # Consultar hora local de la ciudad objetivo
         url_ciudad = f"http://worldtimeapi.org/api/timezone/{timezone_objetivo}"
-        resp_ciudad = requests.get(url_ciudad, timeout=10)
+        resp_ciudad = cliente.get(url_ciudad, timeout=10)
         resp_ciudad.raise_for_status()
         data_ciudad = resp_ciudad.json()
 
         # Consultar hora de Bogotá
         url_bogota = "http://worldtimeapi.org/api/timezone/America/Bogota"
-        resp_bogota = requests.get(url_bogota, timeout=10)
+        resp_bogota = cliente.get(url_bogota, timeout=10)
         resp_bogota.raise_for_status()
         data_bogota = resp_bogota.json()
 
@@ -29,11 +31,11 @@ def obtener_zona_horaria(timezone_objetivo):
 
         logging.info(f"Zona horaria obtenida correctamente para {timezone_objetivo}")
 
-        return {
-            "timezone": timezone_objetivo,
-            "hora_local": data_ciudad["datetime"],
-            "diferencia_horaria_con_bogota": round(diferencia, 1)
-        }
+        return Tiempo(
+            timezone=timezone_objetivo,
+            hora_local=data_ciudad["datetime"],
+            diferencia_horaria_con_bogota=round(diferencia, 1)
+        )
 
     except requests.exceptions.RequestException as e:
         logging.error(f"Error de conexión con WorldTimeAPI ({timezone_objetivo}): {e}")
@@ -1,24 +1,34 @@
+import json
 import time
+import logging
+import argparse
 import schedule
 import datetime
-from src.main import main
-from config.config_logs  import configurar_logger_automatizacion
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from src.main import main, ContextoEjecucion
+from config.config_logs  import configurar_logs_generales, configurar_logger_automatizacion
 
-logger = configurar_logger_automatizacion()
+# Los handlers se configuran al arrancar (ver __main__), no al importar el módulo
+logger = logging.getLogger("automatizador")
 
+INTERVALO_MINUTOS_DEFECTO = 30
 
-def ejecutar_proceso():
-    """ Ejecuta el flujo principal y guarda logs con control de versiones. """
+
+def ejecutar_proceso(contexto=None):
+    """ Ejecuta el flujo principal y guarda logs con control de versiones. Retorna True si terminó bien. """
     try:
-        timestamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%d_%H%M%S")        
+        timestamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%d_%H%M%S")
         logger.info(f"🔄 Iniciando ejecución automática ({timestamp})")
 
-        main()  # Ejecuta el proceso principal
+        main(contexto)  # Ejecuta el proceso principal
 
         logger.info(f"✅ Ejecución completada correctamente ({timestamp})\n")
+        return True
 
     except Exception as e:
         logger.error(f"❌ Error durante la ejecución automática: {e}")
+        return False
 
 
 def iniciar_automatizacion():
@@ -33,5 +43,117 @@ def iniciar_automatizacion():
         time.sleep(10)
 
 
+class ManejadorControl(BaseHTTPRequestHandler):
+    """
+    Interfaz de control local del daemon:
+    - POST /ejecutar: solicita una ejecución inmediata (se encola si hay una en curso).
+    - GET /estado: información de la última ejecución.
+    """
+
+    daemon = None  # DaemonAutomatizacion asignado al crear el servidor
+
+    def do_POST(self):
+        if self.path != "/ejecutar":
+            return self._responder(404, {"error": f"Ruta no encontrada: {self.path}"})
+        self.daemon.solicitar_ejecucion()
+        self._responder(202, {"estado": "ejecución solicitada"})
+
+    def do_GET(self):
+        if self.path != "/estado":
+            return self._responder(404, {"error": f"Ruta no encontrada: {self.path}"})
+        self._responder(200, self.daemon.estado)
+
+    def _responder(self, codigo, datos):
+        cuerpo = json.dumps(datos, ensure_ascii=False).encode("utf-8")
+        self.send_response(codigo)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, formato, *args):
+        logger.info(f"Control {self.address_string()} - {formato % args}")
+
+
+class DaemonAutomatizacion:
+    """
+    Proceso de larga duración que mantiene un ContextoEjecucion entre ejecuciones
+    (config, sesión HTTP, histórico de divisas, alertas y snapshots en memoria)
+    en lugar de arrancar en frío cada 30 minutos.
+    Las ejecuciones programadas y las solicitadas por la interfaz de control pasan por
+    el mismo evento, así que nunca se solapan.
+    """
+
+    def __init__(self):
+        self.contexto = ContextoEjecucion()
+        self._disparo = threading.Event()
+        self._intervalo = None
+        self.estado = {"ejecuciones": 0, "ultima_inicio": None, "ultima_fin": None, "ultima_correcta": None}
+
+    def _config(self):
+        return self.contexto.obtener_config().get("automatizacion", {})
+
+    def solicitar_ejecucion(self):
+        self._disparo.set()
+
+    def _programar(self):
+        """(Re)programa la ejecución periódica si cambió el intervalo en config.json."""
+        try:
+            intervalo = self._config().get("intervalo_minutos", INTERVALO_MINUTOS_DEFECTO)
+        except Exception as e:
+            logger.error(f"❌ Daemon: no se pudo leer config.json, se mantiene el programa actual: {e}")
+            return
+        if intervalo != self._intervalo:
+            schedule.clear("daemon")
+            schedule.every(intervalo).minutes.do(self.solicitar_ejecucion).tag("daemon")
+            self._intervalo = intervalo
+            logger.info(f"🕒 Daemon: ejecución cada {intervalo} minutos.")
+
+    def _ejecutar(self):
+        self.estado["ultima_inicio"] = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds")
+        correcta = ejecutar_proceso(self.contexto)
+        self.estado.update({
+            "ejecuciones": self.estado["ejecuciones"] + 1,
+            "ultima_fin": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "ultima_correcta": correcta
+        })
+        self._programar()
+
+    def _iniciar_control(self):
+        config = self._config()
+        host, puerto = config.get("control_host", "127.0.0.1"), config.get("control_puerto", 8766)
+        manejador = type("ManejadorControlDaemon", (ManejadorControl,), {"daemon": self})
+        servidor = ThreadingHTTPServer((host, puerto), manejador)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        logger.info(f"🎛️ Interfaz de control en http://{host}:{puerto} (POST /ejecutar, GET /estado)")
+        return servidor
+
+    def iniciar(self):
+        """Ejecuta una vez al arrancar y luego queda atendiendo el programa y la interfaz de control."""
+        self._programar()
+        servidor = self._iniciar_control()
+        self.solicitar_ejecucion()
+
+        try:
+            while True:
+                schedule.run_pending()
+                if self._disparo.wait(timeout=10):
+                    self._disparo.clear()
+                    self._ejecutar()
+        finally:
+            servidor.shutdown()
+
+
 if __name__ == "__main__":
-    iniciar_automatizacion()
+    parser = argparse.ArgumentParser(description="Automatización del flujo principal.")
+    parser.add_argument("--daemon", action="store_true",
+                        help="Mantiene el estado en memoria entre ejecuciones y expone una interfaz de control.")
+    args = parser.parse_args()
+
+    configurar_logs_generales()
+    configurar_logger_automatizacion()
+
+    if args.daemon:
+        DaemonAutomatizacion().iniciar()
+    else:
+        iniciar_automatizacion()
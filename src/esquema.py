@@ -0,0 +1,114 @@
+# Esquema del resultado por ciudad (el que escribe ResultadoCiudad.a_dict()) y su validador.
+# El esquema se compila una vez al importar: cada nivel queda como un conjunto de claves
+# requeridas más una tupla de (clave, tipos, subvalidador), sin volver a recorrer las reglas.
+import logging
+
+# Sube cuando cambie el esquema, para que los lectores sepan con qué reglas se validó
+VERSION_ESQUEMA = 1
+
+# Errores que se guardan en la metadata (el resto solo se cuenta)
+MAX_ERRORES_METADATA = 50
+
+NUMERO = (int, float, type(None))
+TEXTO = (str, type(None))
+
+# clave: (tipos admitidos, subesquema | None). En listas el subesquema aplica a cada elemento
+ESQUEMA_CLIMA = {
+    "temperatura_actual": (NUMERO, None),
+    "viento": (NUMERO, None),
+    "uv": (NUMERO, None),
+    "precipitacion": (NUMERO, None),
+    "pronostico_7_dias": ((list, dict), None),
+}
+
+ESQUEMA_FINANZAS = {
+    "moneda": (TEXTO, None),
+    "moneda_base": (TEXTO, None),
+    "tipo_cambio_actual": (NUMERO, None),
+    "variacion_diaria": (NUMERO, None),
+    "tendencia_5_dias": (TEXTO, None),
+    "tasa_usd": (NUMERO, None),
+}
+
+ESQUEMA_TIEMPO = {
+    "timezone": (TEXTO, None),
+    "hora_local": (TEXTO, None),
+    "diferencia_horaria_con_bogota": (NUMERO, None),
+}
+
+ESQUEMA_ALERTA = {
+    "tipo": (str, None),
+    "regla": (TEXTO, None),
+    "severidad": (str, None),
+    "mensaje": (str, None),
+}
+
+ESQUEMA_RESULTADO = {
+    "timestamp": (TEXTO, None),
+    "ciudad": (str, None),
+    "clima": ((dict, type(None)), ESQUEMA_CLIMA),
+    "finanzas": ((dict, type(None)), ESQUEMA_FINANZAS),
+    "tiempo": ((dict, type(None)), ESQUEMA_TIEMPO),
+    "alertas": (list, ESQUEMA_ALERTA),
+    "ivv_score": (NUMERO, None),
+    "nivel_riesgo": (str, None),
+    "componentes_ivv": ((dict, type(None)), None),
+    "color": (str, None),
+    "motivo": (TEXTO, None),
+    "lat": (NUMERO, None),
+    "lon": (NUMERO, None),
+}
+
+
+def compilar(esquema):
+    """Convierte un esquema {clave: (tipos, subesquema)} en una función validar(objeto, ruta) → [errores]."""
+    requeridas = frozenset(esquema)
+    reglas = tuple(
+        (clave, tipos, compilar(sub) if sub else None) for clave, (tipos, sub) in esquema.items()
+    )
+
+    def validar(objeto, ruta=""):
+        if not isinstance(objeto, dict):
+            return [f"{ruta or 'resultado'}: no es un dict"]
+
+        errores = [f"{ruta}{clave}: falta" for clave in sorted(requeridas - objeto.keys())]
+        for clave, tipos, subvalidar in reglas:
+            if clave not in objeto:
+                continue
+            valor = objeto[clave]
+            if not isinstance(valor, tipos):
+                errores.append(f"{ruta}{clave}: tipo {type(valor).__name__} no válido")
+            elif subvalidar and isinstance(valor, list):
+                for i, elemento in enumerate(valor):
+                    errores.extend(subvalidar(elemento, f"{ruta}{clave}[{i}]."))
+            elif subvalidar and valor is not None:
+                errores.extend(subvalidar(valor, f"{ruta}{clave}."))
+        return errores
+
+    return validar
+
+
+validar_resultado = compilar(ESQUEMA_RESULTADO)
+
+
+def validar_resultados(resultados):
+    """
+    Valida cada resultado (esquema JSON) una sola vez. Retorna el estado que se guarda en
+    metadata["validacion"]: {"version", "valido", "invalidos", "errores": [{"ciudad", "errores"}]}.
+    """
+    errores = []
+    for i, resultado in enumerate(resultados):
+        errores_ciudad = validar_resultado(resultado)
+        if errores_ciudad:
+            ciudad = resultado.get("ciudad") if isinstance(resultado, dict) else None
+            errores.append({"ciudad": ciudad or f"elemento {i}", "errores": errores_ciudad})
+
+    if errores:
+        logging.warning(f"Esquema: {len(errores)} de {len(resultados)} resultados no cumplen el esquema")
+
+    return {
+        "version": VERSION_ESQUEMA,
+        "valido": not errores,
+        "invalidos": len(errores),
+        "errores": errores[:MAX_ERRORES_METADATA]
+    }
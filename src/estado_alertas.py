@@ -0,0 +1,161 @@
+import json
+import logging
+from pathlib import Path
+from src.snapshots import escribir_atomico
+
+DIR_DATA = Path(__file__).parent.parent / "data"
+RUTA_ESTADO = DIR_DATA / "estado_alertas.json"
+RUTA_TRANSICIONES = DIR_DATA / "transiciones_alertas.jsonl"
+
+ORDEN_SEVERIDAD = {"BAJA": 1, "MEDIA": 2, "ALTA": 3}
+
+# Sección del resultado de la que sale cada tipo de alerta
+FUENTE_POR_TIPO = {"CLIMA": "clima", "FINANZAS": "finanzas"}
+
+
+def clave_alerta(alerta):
+    """Clave de una alerta dentro de su ciudad: tipo + regla (o el mensaje si no tiene regla)."""
+    return f"{alerta.get('tipo', 'DESCONOCIDO')}:{alerta.get('regla') or alerta.get('mensaje', '')}"
+
+
+def tipos_sin_datos(resultado):
+    """Tipos de alerta cuya fuente falló en este resultado (p. ej. {"CLIMA"} si clima es None)."""
+    return {tipo for tipo, fuente in FUENTE_POR_TIPO.items() if resultado.get(fuente) is None}
+
+
+class MotorAlertas:
+    """
+    Estado persistente de las alertas activas, indexado por ciudad y (tipo, regla).
+
+    En vez de repetir la lista completa de alertas en cada ejecución, solo emite transiciones:
+    - "nueva": la alerta no estaba activa.
+    - "escalada": ya estaba activa y subió de severidad.
+    - "resuelta": estaba activa y dejó de cumplirse (o la ciudad salió del config).
+    Solo se revisan las ciudades cuyo resultado cambió, así que cada ejecución cuesta
+    O(ciudades cambiadas). Cada registro guarda `primera_vez` y `ultima_vez` (la última
+    ejecución en que se revisó su ciudad); las alertas de ciudades sin cambios se consideran
+    vistas en `ultima_ejecucion`, sin reescribir su registro.
+
+    actualizar() calcula el estado nuevo sobre una copia; solo guardar() lo confirma, de
+    modo que si falla la escritura del snapshot o del estado, la siguiente ejecución vuelve
+    a emitir las mismas transiciones en lugar de perderlas.
+    """
+
+    def __init__(self, ruta=RUTA_ESTADO, ruta_transiciones=RUTA_TRANSICIONES):
+        self.ruta = Path(ruta)
+        self.ruta_transiciones = Path(ruta_transiciones)
+        self.nuevo = not self.ruta.exists()
+
+        estado = {"ultima_ejecucion": None, "activas": {}}
+        if not self.nuevo:
+            with open(self.ruta, "r", encoding="utf-8") as f:
+                estado = json.load(f)
+
+        self.ultima_ejecucion = estado["ultima_ejecucion"]
+        self.activas = estado["activas"]
+        self._pendiente = None
+
+    def actualizar(self, alertas_por_ciudad, eliminadas, momento, sin_datos=None):
+        """
+        Calcula el estado nuevo con las alertas de las ciudades cambiadas
+        ({ciudad: [alertas]}) y resuelve las de las ciudades eliminadas.
+        `sin_datos` ({ciudad: {tipo, ...}}, ver tipos_sin_datos) indica los tipos cuya fuente
+        falló en esta ejecución: sus alertas activas se conservan en vez de resolverse.
+        Retorna la lista de transiciones; el estado se confirma al llamar a guardar().
+        """
+        sin_datos = sin_datos or {}
+        transiciones = []
+        activas = dict(self.activas)
+        # Las alertas que se resuelven ahora seguían activas en la ejecución anterior
+        vista_anterior = self.ultima_ejecucion
+
+        for ciudad, alertas in alertas_por_ciudad.items():
+            previas = activas.get(ciudad, {})
+            actuales = {}
+
+            for alerta in alertas:
+                clave = clave_alerta(alerta)
+                registro = dict(previas[clave]) if clave in previas else None
+                severidad = alerta.get("severidad", "BAJA")
+
+                if registro is None:
+                    registro = {"primera_vez": momento}
+                    transiciones.append(self._transicion("nueva", ciudad, alerta, registro, momento))
+                elif ORDEN_SEVERIDAD.get(severidad, 0) > ORDEN_SEVERIDAD.get(registro["severidad"], 0):
+                    transiciones.append(self._transicion(
+                        "escalada", ciudad, alerta, registro, momento, severidad_anterior=registro["severidad"]
+                    ))
+
+                registro.update({
+                    "tipo": alerta.get("tipo"),
+                    "regla": alerta.get("regla"),
+                    "severidad": severidad,
+                    "mensaje": alerta.get("mensaje"),
+                    "ultima_vez": momento
+                })
+                actuales[clave] = registro
+
+            for clave, registro in previas.items():
+                if clave in actuales:
+                    continue
+                if registro.get("tipo") in sin_datos.get(ciudad, ()):
+                    # Sin datos de su fuente no se sabe si dejó de cumplirse: sigue activa
+                    actuales[clave] = registro
+                    continue
+                transiciones.append(self._transicion(
+                    "resuelta", ciudad, registro, registro, momento, ultima_vez=vista_anterior
+                ))
+
+            if actuales:
+                activas[ciudad] = actuales
+            else:
+                activas.pop(ciudad, None)
+
+        for ciudad in eliminadas:
+            for registro in activas.pop(ciudad, {}).values():
+                transiciones.append(self._transicion(
+                    "resuelta", ciudad, registro, registro, momento, ultima_vez=vista_anterior
+                ))
+
+        self._pendiente = {"ultima_ejecucion": momento, "activas": activas}
+        logging.info(
+            f"Alertas evaluadas para {len(alertas_por_ciudad)} ciudades cambiadas: "
+            f"{len(transiciones)} transiciones"
+        )
+        return transiciones
+
+    def _transicion(self, transicion, ciudad, alerta, registro, momento, severidad_anterior=None, ultima_vez=None):
+        datos = {
+            "transicion": transicion,
+            "ciudad": ciudad,
+            "tipo": alerta.get("tipo"),
+            "regla": alerta.get("regla"),
+            "severidad": alerta.get("severidad"),
+            "mensaje": alerta.get("mensaje"),
+            "primera_vez": registro["primera_vez"],
+            "momento": momento
+        }
+        if severidad_anterior is not None:
+            datos["severidad_anterior"] = severidad_anterior
+        if transicion == "resuelta":
+            datos["ultima_vez"] = ultima_vez or registro.get("ultima_vez")
+        return datos
+
+    def guardar(self, transiciones=()):
+        """
+        Añade las transiciones al registro para consumidores externos, persiste el estado
+        calculado por actualizar() y solo entonces lo confirma en memoria.
+        """
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+
+        if transiciones:
+            with open(self.ruta_transiciones, "a", encoding="utf-8") as f:
+                for transicion in transiciones:
+                    f.write(json.dumps(transicion, ensure_ascii=False) + "\n")
+
+        estado = self._pendiente or {"ultima_ejecucion": self.ultima_ejecucion, "activas": self.activas}
+        escribir_atomico(self.ruta, estado)
+
+        self.ultima_ejecucion, self.activas = estado["ultima_ejecucion"], estado["activas"]
+        self._pendiente = None
+        self.nuevo = False
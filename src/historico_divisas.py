@@ -0,0 +1,238 @@
+import csv
+import json
+import logging
+import argparse
+import datetime
+from collections import deque
+from pathlib import Path
+from src.api_divisas import SeguidorTendencia, analizar_tendencias_lote
+from src.snapshots import escribir_atomico
+from config.config_logs import configurar_logs_generales
+
+DIR_HISTORICO = Path(__file__).parent.parent / "data" / "divisas"
+VENTANA_TENDENCIA = 5
+COLUMNAS_CSV = ["fecha", "base", "moneda", "valor"]
+RUTA_CONFIG = Path(__file__).parent.parent / "config" / "config.json"
+
+
+def ventana_config(config):
+    """Ventana de tendencia configurada en divisas.ventana_tendencia (5 por defecto)."""
+    return config.get("divisas", {}).get("ventana_tendencia", VENTANA_TENDENCIA)
+
+
+def normalizar_fecha(fecha):
+    """
+    Convierte una fecha (datetime, timestamp unix o texto ISO) a texto ISO UTC con sufijo Z.
+    Al tener siempre el mismo formato, las fechas se pueden comparar como texto.
+    """
+    if isinstance(fecha, (int, float)):
+        fecha = datetime.datetime.fromtimestamp(fecha, datetime.timezone.utc)
+    elif isinstance(fecha, str):
+        fecha = datetime.datetime.fromisoformat(fecha.strip().replace("Z", "+00:00"))
+
+    if fecha.tzinfo is None:
+        fecha = fecha.replace(tzinfo=datetime.timezone.utc)
+    fecha = fecha.astimezone(datetime.timezone.utc)
+    return fecha.isoformat(timespec="seconds").replace("+00:00", "Z")
+
+
+class HistoricoDivisas:
+    """
+    Serie temporal local de tipos de cambio por par de monedas (p. ej. USD/JPY).
+
+    Cada par tiene dos archivos en /data/divisas/:
+    - <BASE>_<MONEDA>.csv: histórico completo, solo se le añaden filas (auditoría e importación).
+    - <BASE>_<MONEDA>.json: estado compacto con la última fecha, el valor anterior y el estado
+      del SeguidorTendencia, suficiente para calcular variación y tendencia en O(1) por punto nuevo.
+    Un punto nuevo solo se registra si su fecha es posterior a la última guardada, de modo
+    que consultar varias veces la misma tabla (misma actualización) no duplica datos.
+    """
+
+    def __init__(self, directorio=DIR_HISTORICO, ventana=VENTANA_TENDENCIA):
+        self.directorio = Path(directorio)
+        self.ventana = ventana
+        self._estados = {}
+        self._pendientes = {}
+
+    def _nombre_par(self, base, moneda):
+        return f"{base.upper()}_{moneda.upper()}"
+
+    def _estado(self, base, moneda):
+        """Carga (una sola vez) el estado compacto de un par."""
+        par = self._nombre_par(base, moneda)
+        if par not in self._estados:
+            ruta = self.directorio / f"{par}.json"
+            estado = {"ultima_fecha": None, "anterior": None, "seguidor": None}
+            if ruta.exists():
+                with open(ruta, "r", encoding="utf-8") as f:
+                    estado = json.load(f)
+
+            if estado.get("seguidor") and estado["seguidor"]["ventana"] == self.ventana:
+                estado["seguidor"] = SeguidorTendencia.desde_dict(estado["seguidor"])
+            else:
+                # Sin estado o con otra ventana: se reconstruye con las últimas filas del CSV
+                estado = self._reconstruir_estado(par)
+            self._estados[par] = estado
+        return self._estados[par]
+
+    def _reconstruir_estado(self, par):
+        """Estado de un par a partir de las últimas `ventana` filas de su CSV (vacío si no hay CSV)."""
+        estado = {"ultima_fecha": None, "anterior": None, "seguidor": SeguidorTendencia(self.ventana)}
+        ruta_csv = self.directorio / f"{par}.csv"
+        if not ruta_csv.exists():
+            return estado
+
+        with open(ruta_csv, "r", encoding="utf-8", newline="") as f:
+            ultimas = deque(csv.DictReader(f), maxlen=self.ventana)
+
+        for fila in ultimas:
+            estado["ultima_fecha"] = fila["fecha"]
+            estado["anterior"] = estado["seguidor"].ultimo
+            estado["seguidor"].agregar(float(fila["valor"]))
+        return estado
+
+    def registrar(self, moneda, valor, fecha, base="USD"):
+        """
+        Registra un valor observado del par base/moneda.
+        Retorna True si era un punto nuevo y False si ya estaba registrado.
+        """
+        fecha = normalizar_fecha(fecha)
+        estado = self._estado(base, moneda)
+
+        if estado["ultima_fecha"] is not None and fecha <= estado["ultima_fecha"]:
+            return False
+
+        estado["ultima_fecha"] = fecha
+        estado["anterior"] = estado["seguidor"].ultimo
+        estado["seguidor"].agregar(valor)
+        self._pendientes.setdefault(self._nombre_par(base, moneda), []).append(
+            [fecha, base.upper(), moneda.upper(), valor]
+        )
+        return True
+
+    def resumen(self, moneda, base="USD"):
+        """
+        Calcula la variación diaria (último punto vs anterior, en %) y la tendencia
+        sobre la ventana de puntos guardados. Sin histórico suficiente la variación es 0.
+        """
+        estado = self._estado(base, moneda)
+        ultimo, anterior = estado["seguidor"].ultimo, estado["anterior"]
+
+        if ultimo is not None and anterior:
+            variacion_diaria = round(((ultimo - anterior) / anterior) * 100, 2)
+        else:
+            variacion_diaria = 0.0
+
+        return {
+            "variacion_diaria": variacion_diaria,
+            "tendencia": estado["seguidor"].resultado()
+        }
+
+    def pendientes(self):
+        """Puntos registrados y aún no guardados: [[fecha, base, moneda, valor], ...]."""
+        return [fila for filas in self._pendientes.values() for fila in filas]
+
+    def guardar(self):
+        """Persiste los pares modificados: añade filas al CSV y reescribe su estado."""
+        if not self._pendientes:
+            return
+
+        self.directorio.mkdir(parents=True, exist_ok=True)
+
+        for par, filas in self._pendientes.items():
+            ruta_csv = self.directorio / f"{par}.csv"
+            nuevo = not ruta_csv.exists()
+            with open(ruta_csv, "a", encoding="utf-8", newline="") as f:
+                writer = csv.writer(f)
+                if nuevo:
+                    writer.writerow(COLUMNAS_CSV)
+                writer.writerows(filas)
+
+            estado = self._estados[par]
+            ruta_estado = self.directorio / f"{par}.json"
+            escribir_atomico(ruta_estado, {
+                "ultima_fecha": estado["ultima_fecha"],
+                "anterior": estado["anterior"],
+                "seguidor": estado["seguidor"].a_dict()
+            })
+
+        logging.info(f"Histórico de divisas guardado ({len(self._pendientes)} pares actualizados)")
+        self._pendientes = {}
+
+    def importar_csv(self, ruta):
+        """
+        Siembra el histórico desde un CSV con columnas fecha, moneda, valor (y base opcional,
+        USD por defecto). Las filas se ordenan por fecha; las ya registradas se ignoran.
+        """
+        with open(ruta, "r", encoding="utf-8", newline="") as f:
+            filas = [
+                (normalizar_fecha(fila["fecha"]), (fila.get("base") or "USD").upper(),
+                 fila["moneda"].upper(), float(fila["valor"]))
+                for fila in csv.DictReader(f)
+            ]
+
+        filas.sort()
+        nuevos = sum(self.registrar(moneda, valor, fecha, base) for fecha, base, moneda, valor in filas)
+        self.guardar()
+
+        logging.info(f"Importación de {ruta}: {nuevos} puntos nuevos de {len(filas)} filas")
+        return nuevos
+
+    def analizar_historicos(self, ventana):
+        """
+        Recalcula la tendencia de todos los pares guardados con otra longitud de ventana,
+        leyendo los CSV completos y evaluándolos juntos de forma vectorizada.
+        Retorna {par: resultado} con par en formato "BASE/MONEDA".
+        """
+        import numpy as np
+
+        series = {}
+        for ruta_csv in sorted(self.directorio.glob("*.csv")):
+            with open(ruta_csv, "r", encoding="utf-8", newline="") as f:
+                filas = list(csv.DictReader(f))
+            if filas:
+                par = f"{filas[0]['base']}/{filas[0]['moneda']}"
+                series[par] = [float(fila["valor"]) for fila in filas[-ventana:]]
+
+        if not series:
+            return {}
+
+        # Matriz rellenada con NaN a la izquierda para series de distinta longitud
+        matriz = np.full((len(series), ventana), np.nan)
+        for i, valores in enumerate(series.values()):
+            if valores:
+                matriz[i, -len(valores):] = valores
+
+        lote = analizar_tendencias_lote(matriz, ventana)
+        return {
+            par: {
+                "tendencia": str(lote["tendencia"][i]),
+                "dias_consecutivos": int(lote["dias_consecutivos"][i])
+            }
+            for i, par in enumerate(series)
+        }
+
+
+if __name__ == "__main__":
+    with open(RUTA_CONFIG, "r", encoding="utf-8") as f:
+        ventana = ventana_config(json.load(f))
+
+    parser = argparse.ArgumentParser(description="Gestión del histórico local de tipos de cambio.")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+    importar = comandos.add_parser("importar", help="Siembra el histórico desde un CSV.")
+    importar.add_argument("csv", help="CSV con columnas fecha,moneda,valor[,base].")
+    analizar = comandos.add_parser("analizar", help="Recalcula la tendencia de todos los pares guardados.")
+    analizar.add_argument("--ventana", type=int, default=ventana,
+                          help=f"Puntos por par a evaluar (por defecto divisas.ventana_tendencia = {ventana}).")
+    args = parser.parse_args()
+
+    configurar_logs_generales()
+    historico = HistoricoDivisas(ventana=ventana)
+    if args.comando == "importar":
+        nuevos = historico.importar_csv(args.csv)
+        print(f"✅ Histórico sembrado: {nuevos} puntos nuevos.")
+    else:
+        resultados = historico.analizar_historicos(args.ventana)
+        for par, resultado in resultados.items():
+            print(f"💱 {par}: {resultado['tendencia']} ({resultado['dias_consecutivos']} días consecutivos)")
+        print(f"✅ {len(resultados)} pares analizados con ventana de {args.ventana} puntos.")
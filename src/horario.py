@@ -0,0 +1,109 @@
+import shutil
+import logging
+from bisect import bisect_right
+from array import array
+from pathlib import Path
+from src.modelos import _a_float
+from src.snapshots import escribir_atomico
+
+DIR_HORARIO = Path(__file__).parent.parent / "data" / "horario"
+
+# Horas hacia adelante que se resumen para las alertas (máximo por variable)
+HORAS_RESUMEN_DEFECTO = 24
+
+# Carpetas de ejecuciones que se conservan en /data/horario (las más recientes)
+CONSERVAR_EJECUCIONES_DEFECTO = 48
+
+
+def resumir_horario(horario, variables, horas=HORAS_RESUMEN_DEFECTO, desde=None):
+    """
+    Máximo de cada variable en las próximas `horas`: {"horas": 24, variable: máximo | None}.
+    La serie de Open-Meteo empieza a las 00:00 locales de hoy, así que la ventana arranca en
+    la hora que contiene `desde` (current.time de la misma respuesta, en hora local).
+    """
+    inicio = 0
+    if desde:
+        inicio = max(0, bisect_right(horario.get("time") or [], desde) - 1)
+
+    resumen = {"horas": horas}
+    for variable in variables:
+        valores = [v for v in (horario.get(variable) or [])[inicio:inicio + horas] if v is not None]
+        resumen[variable] = max(valores) if valores else None
+    return resumen
+
+
+def limpiar_horario(conservar=CONSERVAR_EJECUCIONES_DEFECTO, directorio=DIR_HORARIO):
+    """Borra las carpetas de ejecución más antiguas y deja solo las `conservar` más recientes."""
+    directorio = Path(directorio)
+    if not directorio.exists():
+        return
+    # Los nombres son el timestamp de la ejecución (YYYYMMDD_HHMMSS): ordenan por fecha
+    carpetas = sorted(c for c in directorio.iterdir() if c.is_dir())
+    antiguas = carpetas[:-conservar] if conservar > 0 else carpetas
+    for carpeta in antiguas:
+        shutil.rmtree(carpeta, ignore_errors=True)
+    if antiguas:
+        logging.info(f"Series horarias: {len(antiguas)} ejecuciones antiguas eliminadas de {directorio}")
+
+
+class EscritorHorario:
+    """
+    Guarda las series horarias de una ejecución en /data/horario/<id_ejecucion>/, aparte del
+    snapshot: un archivo binario float32 por variable (<parte>_<variable>.f32) al que se
+    agrega cada celda en cuanto llega su respuesta, y un índice <parte>_indice.json con la
+    posición de cada ciudad. Así nunca se acumula en memoria más de una celda a la vez.
+    `parte` distingue los escritores de distintas particiones de la misma ejecución.
+    """
+
+    def __init__(self, id_ejecucion, variables, parte="0000", directorio=DIR_HORARIO):
+        self.directorio = Path(directorio) / id_ejecucion
+        self.variables = list(variables)
+        self.parte = parte
+        self.ciudades = {}
+        self._archivos = {}
+        self._posicion = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
+
+    def agregar(self, nombres_ciudades, horario):
+        """Escribe la serie horaria de una celda y la asigna a todas sus ciudades."""
+        tiempos = horario.get("time") or []
+        if not tiempos:
+            return
+
+        if not self._archivos:
+            self.directorio.mkdir(parents=True, exist_ok=True)
+            self._archivos = {
+                v: open(self.directorio / f"{self.parte}_{v}.f32", "wb") for v in self.variables
+            }
+
+        n = len(tiempos)
+        for variable, archivo in self._archivos.items():
+            valores = (horario.get(variable) or [None] * n)[:n]
+            valores = valores + [None] * (n - len(valores))
+            array("f", map(_a_float, valores)).tofile(archivo)
+
+        entrada = {"offset": self._posicion, "n": n, "inicio": tiempos[0]}
+        for nombre in nombres_ciudades:
+            self.ciudades[nombre] = entrada
+        self._posicion += n
+
+    def cerrar(self):
+        """Cierra los binarios y publica el índice (temporal + renombrado)."""
+        for archivo in self._archivos.values():
+            archivo.close()
+        if not self._archivos:
+            return
+
+        ruta = self.directorio / f"{self.parte}_indice.json"
+        escribir_atomico(ruta, {"parte": self.parte, "variables": self.variables, "ciudades": self.ciudades})
+        self._archivos = {}
+
+        logging.info(
+            f"Series horarias guardadas en {self.directorio} "
+            f"({len(self.ciudades)} ciudades, {self._posicion} horas por variable)"
+        )
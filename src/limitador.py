@@ -0,0 +1,174 @@
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from urllib.parse import urlparse
+import requests
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin flock, las cubetas solo se comparten dentro del proceso
+    fcntl = None
+
+DIR_LIMITADORES = Path(__file__).parent.parent / "data" / "limitadores"
+
+# Reintentos de una solicitud que recibe 429 (se espera Retry-After antes de cada uno)
+REINTENTOS_429 = 3
+ESPERA_429_DEFECTO = 5  # segundos si la API no envía Retry-After
+
+_avisado_sin_fcntl = False
+
+# Una cubeta por host y proceso: las recargas de config y las ejecuciones en frío la reutilizan
+_cubetas = {}
+_lock_cubetas = threading.Lock()
+
+
+class CubetaTokens:
+    """
+    Cubeta de tokens por host: admite ráfagas de hasta `rafaga` solicitudes y se recarga a
+    `por_minuto` / 60 tokens por segundo. adquirir() bloquea hasta que haya un token, así que
+    las solicitudes se encolan en vez de fallar cuando se agota el presupuesto.
+
+    Es segura entre hilos. Con `ruta`, el estado (tokens, última recarga, pausa) vive en un
+    archivo protegido con flock y lo comparten todos los procesos del host que usen la
+    misma ruta (p. ej. las particiones de src.particiones). Donde no hay flock (Windows)
+    se ignora `ruta` y la cubeta queda en memoria del proceso.
+    """
+
+    def __init__(self, por_minuto, rafaga=1, ruta=None):
+        global _avisado_sin_fcntl
+        if por_minuto <= 0:
+            raise ValueError(f"por_minuto debe ser mayor que 0 (recibido {por_minuto})")
+        self.tasa = por_minuto / 60.0
+        self.capacidad = max(1, rafaga)
+        if ruta and fcntl is None:
+            if not _avisado_sin_fcntl:
+                logging.warning("fcntl no está disponible: los límites de las APIs no se comparten entre procesos")
+                _avisado_sin_fcntl = True
+            ruta = None
+        self.ruta = Path(ruta) if ruta else None
+        self._lock = threading.Lock()
+        self._estado = {"tokens": float(self.capacidad), "marca": time.time(), "pausa_hasta": 0.0}
+
+    @contextmanager
+    def _estado_bloqueado(self):
+        """Estado de la cubeta con acceso exclusivo (entre hilos y, si hay ruta, entre procesos)."""
+        with self._lock:
+            if self.ruta is None:
+                yield self._estado
+                return
+
+            self.ruta.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.ruta, "a+", encoding="utf-8") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.seek(0)
+                    contenido = f.read()
+                    estado = json.loads(contenido) if contenido else dict(self._estado)
+                    yield estado
+                    f.seek(0)
+                    f.truncate()
+                    json.dump(estado, f)
+                    f.flush()
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def adquirir(self):
+        """Toma un token; si no hay, espera lo justo para que se recargue uno. Retorna los segundos esperados."""
+        esperado = 0.0
+        while True:
+            with self._estado_bloqueado() as estado:
+                ahora = time.time()
+                estado["tokens"] = min(
+                    self.capacidad, estado["tokens"] + (ahora - estado["marca"]) * self.tasa
+                )
+                estado["marca"] = ahora
+
+                espera = estado["pausa_hasta"] - ahora
+                if espera <= 0:
+                    if estado["tokens"] >= 1:
+                        estado["tokens"] -= 1
+                        return esperado
+                    espera = (1 - estado["tokens"]) / self.tasa
+
+            time.sleep(espera)
+            esperado += espera
+
+    def pausar(self, segundos):
+        """Detiene la cubeta `segundos` (p. ej. tras un 429) para todos los que la comparten."""
+        with self._estado_bloqueado() as estado:
+            estado["pausa_hasta"] = max(estado["pausa_hasta"], time.time() + segundos)
+            estado["tokens"] = 0.0
+
+
+def crear_limitadores(config):
+    """
+    Retorna {host: CubetaTokens} según config["limites_apis"], cuyas claves son las mismas
+    de config["apis"] (el host se toma de esa URL). Con "compartir_entre_procesos" (por
+    defecto) el estado de cada cubeta se guarda en /data/limitadores/<host>.json y lo
+    comparten todos los procesos del host, p. ej. los de src.particiones.
+    Las cubetas se reutilizan mientras su límite no cambie, así que volver a llamar a esta
+    función (recarga de config, nueva ejecución) no devuelve una ráfaga completa.
+    Lanza ValueError si algún límite tiene por_minuto <= 0.
+    """
+    limites = config.get("limites_apis", {})
+    compartir = limites.get("compartir_entre_procesos", True)
+    limitadores = {}
+
+    for nombre, url in config.get("apis", {}).items():
+        limite = limites.get(nombre)
+        if not limite:
+            continue
+        host = urlparse(url).hostname
+        ruta = DIR_LIMITADORES / f"{host}.json" if compartir else None
+        parametros = (limite["por_minuto"], limite.get("rafaga", 1), ruta)
+
+        with _lock_cubetas:
+            actual = _cubetas.get(host)
+            if actual is None or actual[0] != parametros:
+                _cubetas[host] = (parametros, CubetaTokens(*parametros))
+            limitadores[host] = _cubetas[host][1]
+
+    return limitadores
+
+
+class SesionLimitada(requests.Session):
+    """
+    requests.Session que pasa cada solicitud por la cubeta de su host antes de enviarla.
+    Si la API responde 429, pausa la cubeta el tiempo de Retry-After (para todos los hilos
+    y procesos que la comparten) y reintenta, en vez de volver a golpear de inmediato.
+    Los hosts sin límite configurado no se limitan.
+    """
+
+    def __init__(self, limitadores=None):
+        super().__init__()
+        self.limitadores = limitadores or {}
+
+    def request(self, method, url, *args, **kwargs):
+        cubeta = self.limitadores.get(urlparse(url).hostname)
+        if cubeta is None:
+            return super().request(method, url, *args, **kwargs)
+
+        for intento in range(REINTENTOS_429 + 1):
+            esperado = cubeta.adquirir()
+            if esperado > 0:
+                logging.debug(f"Límite de {urlparse(url).hostname}: solicitud en espera {esperado:.2f}s")
+
+            respuesta = super().request(method, url, *args, **kwargs)
+            if respuesta.status_code != 429 or intento == REINTENTOS_429:
+                return respuesta
+
+            espera = _segundos_retry_after(respuesta.headers.get("Retry-After"))
+            logging.warning(f"429 de {urlparse(url).hostname}: pausa de {espera}s antes de reintentar")
+            cubeta.pausar(espera)
+
+        return respuesta
+
+
+def _segundos_retry_after(valor):
+    try:
+        return max(0.0, float(valor))
+    except (TypeError, ValueError):
+        return ESPERA_429_DEFECTO
@@ -4,14 +4,20 @@ from src import api_divisas as ad
 from src import api_tempo as at
 from src import procesar_clima as pc 
 from src import procesar_ciudades as pz
+from src import snapshots as snap
+from src import esquema
+from src.horario import (
+    EscritorHorario, resumir_horario, limpiar_horario, HORAS_RESUMEN_DEFECTO, CONSERVAR_EJECUCIONES_DEFECTO
+)
+from src.historico_divisas import HistoricoDivisas, ventana_config
+from src.estado_alertas import MotorAlertas, tipos_sin_datos
+from src.limitador import SesionLimitada, crear_limitadores
 import datetime
 from pathlib import Path
 from tenacity import RetryError
 import logging
 from config.config_logs import configurar_logs_generales
 
-configurar_logs_generales()
-
 
 def manejar_error_api(nombre_api, ciudad, error):
     """
@@ -23,53 +29,227 @@ def manejar_error_api(nombre_api, ciudad, error):
     return None
 
 
+RUTA_CONFIG = Path(__file__).parent.parent / "config" / "config.json"
+
+
 def cargar_config():
-    ruta_config = Path(__file__).parent.parent / "config" / "config.json"
-    with open(ruta_config, "r", encoding="utf-8") as f:
+    with open(RUTA_CONFIG, "r", encoding="utf-8") as f:
         return json.load(f)
 
 
-def main():
-    
-    config = cargar_config()
-    resultados = []
+class ContextoEjecucion:
+    """
+    Estado reutilizable entre ejecuciones del flujo (modo daemon del automatizador):
+    config (recargada solo si cambia el mtime de config.json), sesión HTTP con conexiones
+    persistentes y límites por API (src.limitador), histórico de divisas, motor de alertas y estado de snapshots en memoria.
+    Una ejecución suelta crea su propio contexto, equivalente a empezar en frío.
+    Supone que este proceso es el único que escribe en /data mientras el contexto vive.
+    """
+
+    def __init__(self):
+        self.config = None
+        self._mtime_config = None
+        self.sesion = SesionLimitada()
+        self.historico = HistoricoDivisas()
+        self.motor = MotorAlertas()
+        self.estado_snapshots = snap.cargar_estado()
+
+    def obtener_config(self):
+        """
+        Retorna la config, recargándola solo si config.json cambió desde la última lectura.
+        Si el archivo nuevo no se puede leer (p. ej. guardado a medias), se conserva la última
+        config válida y se vuelve a intentar en la siguiente llamada.
+        """
+        mtime = RUTA_CONFIG.stat().st_mtime_ns
+        if mtime != self._mtime_config:
+            try:
+                config = cargar_config()
+                limitadores = crear_limitadores(config)
+            except (OSError, ValueError) as e:
+                if self.config is None:
+                    raise
+                logging.error(f"config.json no es válido, se mantiene la configuración anterior: {e}")
+                return self.config
+            self.config = config
+            self.sesion.limitadores = limitadores
+            if ventana_config(self.config) != self.historico.ventana:
+                self.historico = HistoricoDivisas(ventana=ventana_config(self.config))
+            if self._mtime_config is not None:
+                logging.info("config.json cambió: configuración recargada.")
+            self._mtime_config = mtime
+        return self.config
+
+
+def obtener_clima_por_celda(ciudades, config, sesion=None, escritor_horario=None):
+    """
+    Consulta Open-Meteo una sola vez por celda de la rejilla y reparte la respuesta
+    a todas las ciudades de esa celda. Retorna una lista de datos_raw | None alineada con `ciudades`.
+    Con un EscritorHorario, la serie horaria de cada celda se escribe a disco en cuanto
+    llega y en la respuesta solo queda su resumen ("resumen_horario") para las alertas.
+    """
+    config_clima = config.get("clima", {})
+    resolucion = config_clima.get("resolucion_celda_grados", ac.RESOLUCION_CELDA_DEFECTO)
+    variables_horarias = escritor_horario.variables if escritor_horario else None
+    horas_resumen = config_clima.get("horario", {}).get("horas_alerta", HORAS_RESUMEN_DEFECTO)
+    celdas = ac.agrupar_por_celda(ciudades, resolucion)
+    logging.info(f"Clima: {len(ciudades)} ciudades agrupadas en {len(celdas)} celdas (resolución {resolucion}°)")
+
+    clima_raw = [None] * len(ciudades)
+    for (lat, lon), indices in celdas.items():
+        ciudades_celda = [ciudades[i] for i in indices]
+        try:
+            datos = ac.obtener_datos_clima(lat, lon, sesion, variables_horarias)
+        except RetryError as e:
+            for ciudad in ciudades_celda:
+                manejar_error_api("Open-Meteo", ciudad["nombre"], e)
+            datos = None
+
+        if datos and escritor_horario and "hourly" in datos:
+            horario = datos.pop("hourly")
+            escritor_horario.agregar([c["nombre"] for c in ciudades_celda], horario)
+            datos["resumen_horario"] = resumir_horario(
+                horario, variables_horarias, horas_resumen, datos.get("current", {}).get("time")
+            )
+
+        for i in indices:
+            clima_raw[i] = datos
+
+    return clima_raw
 
-    for ciudad in config["ciudades"]:
+
+def procesar_lista_ciudades(ciudades, config, contexto=None, id_ejecucion=None, parte="0000", historico=None):
+    """
+    Procesa una lista de ciudades del config y retorna sus resultados en el mismo orden.
+    Es la unidad de trabajo que reutilizan tanto la ejecución normal como las particiones.
+    Con un ContextoEjecucion se reutilizan su sesión HTTP y su histórico de divisas; sin él
+    se crea una sesión con los límites de config["limites_apis"] (src.limitador).
+    Si clima.horario.variables tiene variables y se indica `id_ejecucion`, sus series
+    horarias se guardan en /data/horario/<id_ejecucion>/ (src.horario).
+    Si se pasa un `historico`, los puntos de divisas se registran en él pero guardarlo queda
+    a cargo de quien llama (las particiones los guardan una sola vez al fusionar).
+    """
+    resultados = []
+    sesion = contexto.sesion if contexto else SesionLimitada(crear_limitadores(config))
+    variables_horarias = config.get("clima", {}).get("horario", {}).get("variables") or []
+
+    if variables_horarias and id_ejecucion:
+        with EscritorHorario(id_ejecucion, variables_horarias, parte) as escritor:
+            clima_raw = obtener_clima_por_celda(ciudades, config, sesion, escritor)
+    else:
+        clima_raw = obtener_clima_por_celda(ciudades, config, sesion)
+    guardar_historico = historico is None
+    if historico is None:
+        historico = contexto.historico if contexto else HistoricoDivisas(ventana=ventana_config(config))
+    moneda_base = config.get("divisas", {}).get("moneda_base", "USD")
+
+    # --- Tabla de tipos de cambio: una sola descarga para todas las ciudades y bases ---
+    try:
+        matriz = ad.MatrizCambios(ad.obtener_tabla_tasas(sesion))
+        matriz.cruces(moneda_base, [c["moneda"] for c in ciudades])
+    except (RetryError, ValueError) as e:
+        logging.error(f"[ExchangeRate API] No se pudo construir la matriz de cambios: {e}")
+        matriz = None
+
+    for ciudad, datos_clima_raw in zip(ciudades, clima_raw):
         nombre = ciudad["nombre"]
         print(f"\n🌍 Procesando ciudad: {nombre}")
 
-        # --- Clima ---
-        try:
-            datos_clima_raw = ac.obtener_datos_clima(ciudad["lat"], ciudad["lon"])
-            datos_clima = pc.transformar_datos_clima(datos_clima_raw, nombre)
-        except RetryError as e:
-            datos_clima = manejar_error_api("Open-Meteo", nombre, e)
+        # --- Clima (ya consultado por celda) ---
+        datos_clima = pc.transformar_datos_clima(datos_clima_raw, nombre) if datos_clima_raw else None
 
         # --- Finanzas ---
-        try:
-            datos_divisas = ad.obtener_tipo_cambio(ciudad["moneda"])
-        except RetryError as e:
-            datos_divisas = manejar_error_api("ExchangeRate API", nombre, e)
+        if matriz is None:
+            datos_divisas = manejar_error_api("ExchangeRate API", nombre, "tabla de tasas no disponible")
+        else:
+            try:
+                datos_divisas = ad.obtener_tipo_cambio(ciudad["moneda"], historico, matriz, moneda_base)
+            except ValueError as e:
+                datos_divisas = manejar_error_api("ExchangeRate API", nombre, e)
 
         # --- Tiempo ---
         try:
-            datos_tiempo = at.obtener_zona_horaria(ciudad["timezone"])
+            datos_tiempo = at.obtener_zona_horaria(ciudad["timezone"], sesion)
         except RetryError as e:
             datos_tiempo = manejar_error_api("WorldTimeAPI", nombre, e)
 
         # --- Combinar resultados (aunque alguno sea None) ---
         resultado_ciudad = pz.procesar_ciudad(ciudad, datos_clima, datos_divisas, datos_tiempo)
         resultados.append(resultado_ciudad)
-        
 
-     # --- Guardar resultado general con versiones ---
+    if guardar_historico:
+        historico.guardar()
+    return resultados
+
+
+def guardar_resultado(resultados, config, timestamp=None, contexto=None):
+    """
+    Guarda el resultado general versionado en /data/resultado_general_<timestamp>.json,
+    como snapshot completo o como delta con solo las ciudades que cambiaron (src.snapshots).
+    Antes actualiza el estado de alertas con las ciudades cambiadas y guarda sus
+    transiciones (nuevas, escaladas, resueltas) en la metadata del snapshot.
+    Si no se indica timestamp se usa la hora UTC actual. Retorna la ruta escrita.
+    `resultados` son registros ResultadoCiudad: solo aquí se convierten al esquema JSON,
+    con el pronóstico por filas o por columnas según clima.formato_pronostico, y se
+    validan una sola vez (src.esquema); el resultado queda en metadata["validacion"].
+    """
+    formato = config.get("clima", {}).get("formato_pronostico", "filas")
+    resultados = [r.a_dict(columnar=formato == "columnas") for r in resultados]
+    validacion = esquema.validar_resultados(resultados)
+    ahora = datetime.datetime.now(datetime.timezone.utc)
+    if timestamp is None:
+        timestamp = ahora.strftime("%Y%m%d_%H%M%S")
+    # Carpeta de /data/horario con las series horarias de esta ejecución (si están activadas)
+    config_horario = config.get("clima", {}).get("horario", {})
+    horario = timestamp if config_horario.get("variables") else None
+
+    estado = contexto.estado_snapshots if contexto else snap.cargar_estado()
+    cambios = snap.detectar_cambios(resultados, estado)
+
+    # --- Alertas: solo se revisan las ciudades cambiadas (o todas si no hay estado previo) ---
+    motor = contexto.motor if contexto else MotorAlertas()
+    revisar = None if motor.nuevo else set(cambios["cambiadas"])
+    revisados = [r for r in resultados if revisar is None or r["ciudad"] in revisar]
+    alertas_por_ciudad = {r["ciudad"]: r["alertas"] for r in revisados}
+    # Si una API falló, las alertas de su tipo no se resuelven (faltan datos, no la condición)
+    sin_datos = {r["ciudad"]: tipos_sin_datos(r) for r in revisados}
+    momento = ahora.isoformat(timespec="seconds").replace("+00:00", "Z")
+    # El motor solo confirma su estado en motor.guardar(), después de escribir el snapshot
+    transiciones = motor.actualizar(alertas_por_ciudad, cambios["eliminadas"], momento, sin_datos)
+
+    completo_cada = config.get("snapshots", {}).get("completo_cada", snap.COMPLETO_CADA_DEFECTO)
+    ruta, _, nuevo_estado = snap.guardar_snapshot(
+        resultados, timestamp, completo_cada, estado, cambios,
+        metadata_extra={
+            "formato_pronostico": formato,
+            "horario": horario,
+            "transiciones_alertas": transiciones,
+            "validacion": validacion
+        }
+    )
+    motor.guardar(transiciones)
+    if horario:
+        limpiar_horario(config_horario.get("conservar_ejecuciones", CONSERVAR_EJECUCIONES_DEFECTO))
+
+    if contexto:
+        contexto.estado_snapshots = nuevo_estado
+    return ruta
+
+
+def main(contexto=None):
+    """
+    Ejecuta el flujo completo. Sin contexto arranca en frío (lee config y estados del disco);
+    el automatizador en modo daemon pasa su ContextoEjecucion para reutilizarlos.
+    """
+    contexto = contexto or ContextoEjecucion()
+    config = contexto.obtener_config()
     timestamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%d_%H%M%S")
-    ruta = Path(__file__).parent.parent / "data" / f"resultado_general_{timestamp}.json"
+    resultados = procesar_lista_ciudades(config["ciudades"], config, contexto, timestamp)
 
-    with open(ruta, "w", encoding="utf-8") as f:
-        json.dump(resultados, f, indent=4, ensure_ascii=False)
+    # --- Guardar resultado general con versiones ---
+    ruta = guardar_resultado(resultados, config, timestamp, contexto=contexto)
 
-    print("\n✅ Proceso completado. Datos guardados en /data/resultado_general.json")
+    print(f"\n✅ Proceso completado. Datos guardados en /data/{ruta.name}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    configurar_logs_generales()
+    main()
@@ -0,0 +1,250 @@
+# Registros compactos (dataclasses con __slots__) que usa el flujo internamente.
+# Solo se convierten al esquema JSON (dicts y listas) con a_dict() al guardar el resultado.
+import math
+import datetime
+from array import array
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence, Tuple
+
+
+def _a_float(valor):
+    """None → NaN, para poder guardar valores ausentes en un array('d')."""
+    return math.nan if valor is None else float(valor)
+
+
+def _desde_float(valor):
+    """NaN → None, para volver al JSON original."""
+    return None if math.isnan(valor) else valor
+
+
+def _a_columna(valores):
+    """
+    Columna compacta que conserva el tipo de cada valor al volver al JSON: array('q') si todos
+    son enteros, array('d') si son float o None, y una tupla si la columna mezcla tipos.
+    """
+    valores = list(valores)
+    if all(type(v) is int for v in valores):
+        return array("q", valores)
+    if all(v is None or type(v) is float for v in valores):
+        return array("d", map(_a_float, valores))
+    return tuple(valores)
+
+
+def _desde_columna(columna):
+    if isinstance(columna, array) and columna.typecode == "d":
+        return [_desde_float(v) for v in columna]
+    return list(columna)
+
+
+@dataclass(slots=True)
+class Pronostico:
+    """
+    Pronóstico en columnas: fechas como ordinales (array('l')) y una columna por variable
+    (temp_max, temp_min, ...), normalmente array('d'); ver _a_columna. Agregar una variable
+    no cambia la estructura.
+    """
+    fechas: array
+    variables: Dict[str, Sequence]
+
+    @classmethod
+    def desde_columnas(cls, fechas, **variables):
+        return cls(
+            array("l", (datetime.date.fromisoformat(f).toordinal() for f in fechas)),
+            {nombre: _a_columna(valores) for nombre, valores in variables.items()}
+        )
+
+    @classmethod
+    def desde_lista(cls, filas):
+        nombres = [k for k in (filas[0] if filas else {}) if k != "fecha"]
+        return cls.desde_columnas(
+            [f["fecha"] for f in filas], **{n: [f.get(n) for f in filas] for n in nombres}
+        )
+
+    @classmethod
+    def desde_json(cls, datos):
+        """Acepta los dos formatos guardados: columnas ({"fecha": [...], ...}) o filas ([{...}, ...])."""
+        if isinstance(datos, dict):
+            columnas = dict(datos)
+            return cls.desde_columnas(columnas.pop("fecha", []), **columnas)
+        return cls.desde_lista(datos or [])
+
+    def columnas(self):
+        """{"fecha": [...], "temp_max": [...], "temp_min": [...]} sin objetos por fila."""
+        return {
+            "fecha": [datetime.date.fromordinal(o).isoformat() for o in self.fechas],
+            **{nombre: _desde_columna(valores) for nombre, valores in self.variables.items()}
+        }
+
+    def a_lista(self):
+        """Formato por filas: un dict {"fecha", "temp_max", "temp_min"} por día."""
+        columnas = self.columnas()
+        nombres = list(columnas)
+        return [dict(zip(nombres, fila)) for fila in zip(*columnas.values())]
+
+
+@dataclass(slots=True)
+class Clima:
+    timestamp: str
+    temperatura_actual: Optional[float]
+    viento: Optional[float]
+    uv: Optional[float]
+    precipitacion: Optional[float]
+    pronostico: Pronostico
+    # Máximos de las variables horarias en las próximas horas (solo si están activadas)
+    resumen_horario: Optional[Dict[str, float]] = None
+
+    def a_dict(self, columnar=False):
+        datos = {
+            "temperatura_actual": self.temperatura_actual,
+            "viento": self.viento,
+            "uv": self.uv,
+            "precipitacion": self.precipitacion,
+            "pronostico_7_dias": self.pronostico.columnas() if columnar else self.pronostico.a_lista()
+        }
+        if self.resumen_horario is not None:
+            datos["resumen_horario"] = self.resumen_horario
+        return datos
+
+    @classmethod
+    def desde_dict(cls, datos, timestamp):
+        return cls(
+            timestamp,
+            datos.get("temperatura_actual"),
+            datos.get("viento"),
+            datos.get("uv"),
+            datos.get("precipitacion"),
+            Pronostico.desde_json(datos.get("pronostico_7_dias")),
+            datos.get("resumen_horario")
+        )
+
+
+@dataclass(slots=True)
+class Finanzas:
+    moneda: str
+    moneda_base: str
+    tipo_cambio_actual: float
+    variacion_diaria: float
+    tendencia_5_dias: str
+    tasa_usd: Optional[float]
+
+    def a_dict(self):
+        return {
+            "moneda": self.moneda,
+            "moneda_base": self.moneda_base,
+            "tipo_cambio_actual": self.tipo_cambio_actual,
+            "variacion_diaria": self.variacion_diaria,
+            "tendencia_5_dias": self.tendencia_5_dias,
+            "tasa_usd": self.tasa_usd
+        }
+
+    @classmethod
+    def desde_dict(cls, datos):
+        return cls(
+            datos.get("moneda"),
+            datos.get("moneda_base", "USD"),
+            datos.get("tipo_cambio_actual"),
+            datos.get("variacion_diaria", 0.0),
+            datos.get("tendencia_5_dias", "estable"),
+            datos.get("tasa_usd")
+        )
+
+
+@dataclass(slots=True)
+class Tiempo:
+    timezone: str
+    hora_local: str
+    diferencia_horaria_con_bogota: float
+
+    def a_dict(self):
+        return {
+            "timezone": self.timezone,
+            "hora_local": self.hora_local,
+            "diferencia_horaria_con_bogota": self.diferencia_horaria_con_bogota
+        }
+
+    @classmethod
+    def desde_dict(cls, datos):
+        return cls(datos.get("timezone"), datos.get("hora_local"), datos.get("diferencia_horaria_con_bogota"))
+
+
+@dataclass(slots=True)
+class Alerta:
+    tipo: str
+    regla: Optional[str]
+    severidad: str
+    mensaje: str
+
+    def a_dict(self):
+        return {"tipo": self.tipo, "regla": self.regla, "severidad": self.severidad, "mensaje": self.mensaje}
+
+    @classmethod
+    def desde_dict(cls, datos):
+        return cls(datos.get("tipo"), datos.get("regla"), datos.get("severidad"), datos.get("mensaje"))
+
+
+@dataclass(slots=True)
+class ComponentesIVV:
+    clima_score: float
+    cambio_score: float
+    uv_score: float
+
+    def a_dict(self):
+        return {"clima_score": self.clima_score, "cambio_score": self.cambio_score, "uv_score": self.uv_score}
+
+
+@dataclass(slots=True)
+class ResultadoCiudad:
+    timestamp: Optional[str]
+    ciudad: str
+    clima: Optional[Clima]
+    finanzas: Optional[Finanzas]
+    tiempo: Optional[Tiempo]
+    alertas: Tuple[Alerta, ...]
+    ivv_score: Optional[float]
+    nivel_riesgo: str
+    componentes_ivv: Optional[ComponentesIVV]
+    color: str
+    motivo: Optional[str]
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+
+    def a_dict(self, columnar=False):
+        """
+        Convierte el registro al esquema JSON de resultado_general_*.json.
+        Con `columnar` el pronóstico se escribe como columnas en vez de una fila por día.
+        """
+        return {
+            "timestamp": self.timestamp,
+            "ciudad": self.ciudad,
+            "clima": self.clima.a_dict(columnar) if self.clima else None,
+            "finanzas": self.finanzas.a_dict() if self.finanzas else None,
+            "tiempo": self.tiempo.a_dict() if self.tiempo else None,
+            "alertas": [a.a_dict() for a in self.alertas],
+            "ivv_score": self.ivv_score,
+            "nivel_riesgo": self.nivel_riesgo,
+            "componentes_ivv": self.componentes_ivv.a_dict() if self.componentes_ivv else None,
+            "color": self.color,
+            "motivo": self.motivo,
+            "lat": self.lat,
+            "lon": self.lon
+        }
+
+    @classmethod
+    def desde_dict(cls, datos):
+        """Reconstruye el registro desde el esquema JSON (p. ej. al fusionar parciales)."""
+        componentes = datos.get("componentes_ivv") or None
+        return cls(
+            datos.get("timestamp"),
+            datos["ciudad"],
+            Clima.desde_dict(datos["clima"], datos.get("timestamp")) if datos.get("clima") else None,
+            Finanzas.desde_dict(datos["finanzas"]) if datos.get("finanzas") else None,
+            Tiempo.desde_dict(datos["tiempo"]) if datos.get("tiempo") else None,
+            tuple(Alerta.desde_dict(a) for a in datos.get("alertas", [])),
+            datos.get("ivv_score"),
+            datos.get("nivel_riesgo", "DESCONOCIDO"),
+            ComponentesIVV(**componentes) if componentes else None,
+            datos.get("color", "#6c757d"),
+            datos.get("motivo"),
+            datos.get("lat"),
+            datos.get("lon")
+        )
@@ -0,0 +1,172 @@
+import os
+import json
+import shutil
+import hashlib
+import logging
+import argparse
+import datetime
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from src import main as flujo
+from src import api_clima as ac
+from src.modelos import ResultadoCiudad
+from src.snapshots import escribir_atomico
+from src.historico_divisas import HistoricoDivisas, ventana_config
+from config.config_logs import configurar_logs_generales
+
+DIR_PARCIALES = Path(__file__).parent.parent / "data" / "parciales"
+
+
+def asignar_particion(ciudad, total, resolucion=ac.RESOLUCION_CELDA_DEFECTO):
+    """
+    Determina la partición (0..total-1) a la que pertenece una ciudad.
+    Usa el campo opcional "particion" del config; si no existe, un hash estable de su celda
+    de la rejilla climática (md5, no hash() de Python, para que todos los procesos y hosts
+    coincidan). Así las ciudades de una misma celda caen en la misma partición y la celda
+    se consulta una sola vez en toda la ejecución.
+    """
+    if ciudad.get("particion") is not None:
+        return int(ciudad["particion"]) % total
+
+    lat, lon = ac.clave_celda(ciudad["lat"], ciudad["lon"], resolucion)
+    digest = hashlib.md5(f"{lat:.4f},{lon:.4f}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % total
+
+
+def particionar_ciudades(ciudades, total, resolucion=ac.RESOLUCION_CELDA_DEFECTO):
+    """
+    Reparte la lista de ciudades en `total` particiones conservando el orden relativo.
+    Retorna, por partición, las posiciones de sus ciudades en `ciudades` (no los nombres,
+    que pueden repetirse). `resolucion` debe ser la misma de clima.resolucion_celda_grados.
+    """
+    if total < 1:
+        raise ValueError("El número de particiones debe ser mayor o igual a 1.")
+
+    particiones = [[] for _ in range(total)]
+    for i, ciudad in enumerate(ciudades):
+        particiones[asignar_particion(ciudad, total, resolucion)].append(i)
+    return particiones
+
+
+def ruta_parcial(id_ejecucion, indice, total):
+    """Ruta del resultado parcial de una partición dentro de /data/parciales/<id_ejecucion>/."""
+    return DIR_PARCIALES / id_ejecucion / f"parcial_{indice:04d}_de_{total:04d}.json"
+
+
+def ejecutar_particion(id_ejecucion, indice, total):
+    """
+    Procesa solo las ciudades de la partición `indice` y escribe su resultado parcial.
+    Puede ejecutarse en un proceso local o en otro host que comparta /data/parciales.
+    Los puntos de divisas no se guardan aquí: van en el parcial y se registran una sola vez
+    al fusionar, para que varias particiones con la misma moneda no dupliquen el histórico.
+    """
+    config = flujo.cargar_config()
+    resolucion = config.get("clima", {}).get("resolucion_celda_grados", ac.RESOLUCION_CELDA_DEFECTO)
+    indices = particionar_ciudades(config["ciudades"], total, resolucion)[indice]
+    ciudades = [config["ciudades"][i] for i in indices]
+    logging.info(f"Partición {indice + 1}/{total} ({id_ejecucion}): {len(ciudades)} ciudades")
+
+    historico = HistoricoDivisas(ventana=ventana_config(config))
+    resultados = flujo.procesar_lista_ciudades(
+        ciudades, config, id_ejecucion=id_ejecucion, parte=f"{indice:04d}", historico=historico
+    )
+
+    ruta = ruta_parcial(id_ejecucion, indice, total)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+
+    # Escribir a un temporal y renombrar para que la fusión nunca lea un parcial a medias
+    # El pronóstico va en columnas: la fusión lo reconstruye sin pasar por un dict por día
+    escribir_atomico(ruta, {
+        "indices": indices,
+        "divisas": historico.pendientes(),
+        "resultados": [r.a_dict(columnar=True) for r in resultados]
+    })
+
+    logging.info(f"Resultado parcial guardado en {ruta}")
+    return ruta
+
+
+def fusionar_parciales(id_ejecucion, total, limpiar=True):
+    """
+    Une los resultados parciales de una ejecución en el resultado_general_<id_ejecucion>.json
+    habitual, respetando el orden de ciudades del config (cada parcial guarda la posición de
+    sus ciudades en config["ciudades"]). Falla si falta alguna partición.
+    También registra en el histórico de divisas los puntos de todas las particiones; los
+    repetidos (misma fecha de la tabla) se ignoran, así que cada par suma un punto por ejecución.
+    """
+    faltantes = [i for i in range(total) if not ruta_parcial(id_ejecucion, i, total).exists()]
+    if faltantes:
+        raise FileNotFoundError(
+            f"Faltan resultados parciales de la ejecución {id_ejecucion}: particiones {faltantes}"
+        )
+
+    por_indice = {}
+    puntos_divisas = []
+    for i in range(total):
+        with open(ruta_parcial(id_ejecucion, i, total), "r", encoding="utf-8") as f:
+            parcial = json.load(f)
+        puntos_divisas.extend(parcial["divisas"])
+        for i, datos in zip(parcial["indices"], parcial["resultados"]):
+            por_indice[i] = ResultadoCiudad.desde_dict(datos)
+
+    config = flujo.cargar_config()
+    historico = HistoricoDivisas(ventana=ventana_config(config))
+    for fecha, base, moneda, valor in sorted(puntos_divisas):
+        historico.registrar(moneda, valor, fecha, base)
+    historico.guardar()
+
+    resultados = [por_indice[i] for i in sorted(por_indice)]
+
+    ruta = flujo.guardar_resultado(resultados, config, id_ejecucion)
+
+    if limpiar:
+        shutil.rmtree(DIR_PARCIALES / id_ejecucion, ignore_errors=True)
+
+    logging.info(f"Fusión completada: {total} particiones → {ruta.name}")
+    return ruta
+
+
+def ejecutar_multiproceso(procesos):
+    """Ejecuta todas las particiones en procesos locales y fusiona el resultado."""
+    id_ejecucion = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%d_%H%M%S")
+
+    # Cada proceso configura sus logs al arrancar (necesario con el método "spawn")
+    with ProcessPoolExecutor(max_workers=procesos, initializer=configurar_logs_generales) as pool:
+        list(pool.map(
+            ejecutar_particion,
+            [id_ejecucion] * procesos,
+            range(procesos),
+            [procesos] * procesos
+        ))
+
+    return fusionar_parciales(id_ejecucion, procesos)
+
+
+def _argumentos():
+    parser = argparse.ArgumentParser(description="Ejecución particionada del flujo principal.")
+    parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1,
+                        help="Procesos locales cuando se ejecutan todas las particiones en este host.")
+    parser.add_argument("--total", type=int, help="Número total de particiones (modo multi-host).")
+    parser.add_argument("--indice", type=int, help="Partición a procesar en este host (0..total-1).")
+    parser.add_argument("--id-ejecucion", help="Identificador común de la ejecución (YYYYMMDD_HHMMSS).")
+    parser.add_argument("--fusionar", action="store_true", help="Solo fusiona los parciales existentes.")
+    args = parser.parse_args()
+
+    if (args.fusionar or args.indice is not None) and (args.total is None or args.id_ejecucion is None):
+        parser.error("--indice y --fusionar requieren --total e --id-ejecucion.")
+    return args
+
+
+if __name__ == "__main__":
+    args = _argumentos()
+    configurar_logs_generales()
+
+    if args.fusionar:
+        ruta = fusionar_parciales(args.id_ejecucion, args.total)
+        print(f"\n✅ Fusión completada. Datos guardados en /data/{ruta.name}")
+    elif args.indice is not None:
+        ruta = ejecutar_particion(args.id_ejecucion, args.indice, args.total)
+        print(f"\n✅ Partición {args.indice} completada. Parcial guardado en {ruta}")
+    else:
+        ruta = ejecutar_multiproceso(args.procesos)
+        print(f"\n✅ Proceso particionado completado. Datos guardados en /data/{ruta.name}")
@@ -1,34 +1,46 @@
 import logging
+from src.modelos import Alerta, ComponentesIVV, ResultadoCiudad
 
 def evaluar_alertas(ciudad, datos_clima, datos_finanzas):
     """
     Evalúa las alertas climáticas y financieras para una ciudad.
-    Retorna una lista de alertas activas.
+    Retorna una lista de alertas activas (registros Alerta).
     """
     alertas = []
 
     # --- Alerta climática crítica ---
     if datos_clima:
-        temp = datos_clima["clima"]["temperatura_actual"]
-        viento = datos_clima["clima"]["viento"]
-        lluvia = datos_clima["clima"]["precipitacion"]
+        temp = datos_clima.temperatura_actual
+        viento = datos_clima.viento
+        lluvia = datos_clima.precipitacion
 
         if temp > 35 or temp < 0:
-            alertas.append({"tipo": "CLIMA", "severidad": "ALTA", "mensaje": f"Temperatura extrema ({temp}°C)"})
+            alertas.append(Alerta("CLIMA", "temperatura_extrema", "ALTA", f"Temperatura extrema ({temp}°C)"))
         if lluvia > 70:
-            alertas.append({"tipo": "CLIMA", "severidad": "MEDIA", "mensaje": f"Alta probabilidad de lluvia ({lluvia}%)"})
+            alertas.append(Alerta("CLIMA", "lluvia", "MEDIA", f"Alta probabilidad de lluvia ({lluvia}%)"))
         if viento > 50:
-            alertas.append({"tipo": "CLIMA", "severidad": "MEDIA", "mensaje": f"Viento fuerte ({viento} km/h)"})
+            alertas.append(Alerta("CLIMA", "viento", "MEDIA", f"Viento fuerte ({viento} km/h)"))
+
+        # --- Alertas sobre las próximas horas (solo con variables horarias activadas) ---
+        resumen = datos_clima.resumen_horario or {}
+        horas = resumen.get("horas")
+        lluvia_max = resumen.get("precipitation_probability")
+        viento_max = resumen.get("wind_speed_10m")
+
+        if lluvia_max is not None and lluvia_max > 70 and lluvia <= 70:
+            alertas.append(Alerta("CLIMA", "lluvia_proximas_horas", "BAJA", f"Probabilidad de lluvia de {lluvia_max}% en las próximas {horas} h"))
+        if viento_max is not None and viento_max > 50 and viento <= 50:
+            alertas.append(Alerta("CLIMA", "viento_proximas_horas", "BAJA", f"Viento de hasta {viento_max} km/h en las próximas {horas} h"))
 
     # --- Alerta de tipo de cambio ---
     if datos_finanzas:
-        variacion = datos_finanzas["variacion_diaria"]
-        tendencia = datos_finanzas["tendencia_5_dias"]
+        variacion = datos_finanzas.variacion_diaria
+        tendencia = datos_finanzas.tendencia_5_dias
 
         if abs(variacion) > 3:
-            alertas.append({"tipo": "FINANZAS", "severidad": "ALTA", "mensaje": f"Variación de tipo de cambio > 3% ({variacion}%)"})
+            alertas.append(Alerta("FINANZAS", "variacion_cambio", "ALTA", f"Variación de tipo de cambio > 3% ({variacion}%)"))
         if tendencia == "negativa":
-            alertas.append({"tipo": "FINANZAS", "severidad": "BAJA", "mensaje": "Tendencia negativa en el tipo de cambio"})
+            alertas.append(Alerta("FINANZAS", "tendencia_negativa", "BAJA", "Tendencia negativa en el tipo de cambio"))
 
     logging.info(f"Alertas evaluadas para {ciudad}: {len(alertas)} encontradas")
     return alertas
@@ -52,15 +64,15 @@ def calcular_ivv(datos_clima, datos_finanzas):
             "ivv_score": None,
             "nivel_riesgo": "DESCONOCIDO",
             "color": "#6c757d", 
-            "componentes_ivv": {},
+            "componentes_ivv": None,
             "motivo": " / ".join(motivo)
         }
 
     # --- Calcular componentes del IVV ---
     alertas_climaticas = 0
-    temp = datos_clima["clima"]["temperatura_actual"]
-    lluvia = datos_clima["clima"]["precipitacion"]
-    viento = datos_clima["clima"]["viento"]
+    temp = datos_clima.temperatura_actual
+    lluvia = datos_clima.precipitacion
+    viento = datos_clima.viento
 
     # Criterios de alertas
     if temp > 35 or temp < 0: alertas_climaticas += 1
@@ -69,8 +81,8 @@ def calcular_ivv(datos_clima, datos_finanzas):
 
     clima_score = 100 - (alertas_climaticas * 25)
 
-    cambio_score = 50 if abs(datos_finanzas["variacion_diaria"]) > 3 else 100
-    uv = datos_clima["clima"]["uv"]
+    cambio_score = 50 if abs(datos_finanzas.variacion_diaria) > 3 else 100
+    uv = datos_clima.uv
 
     if uv < 6:
         uv_score = 100
@@ -100,35 +112,34 @@ def calcular_ivv(datos_clima, datos_finanzas):
         "ivv_score": ivv,
         "nivel_riesgo": nivel,
         "color": color, # Util para UI
-        "componentes_ivv": {
-            "clima_score": clima_score,
-            "cambio_score": cambio_score,
-            "uv_score": uv_score
-        },
+        "componentes_ivv": ComponentesIVV(clima_score, cambio_score, uv_score),
         "motivo": None
     }
 
 def procesar_ciudad(ciudad, datos_clima, datos_finanzas, datos_tiempo):
     """
     Integra los datos de clima, finanzas y tiempo para una ciudad.
-    Retorna un diccionario completo con alertas e IVV calculado.
+    Retorna un ResultadoCiudad con alertas e IVV calculado (a_dict() lo lleva al esquema JSON).
     """
     alertas = evaluar_alertas(ciudad["nombre"], datos_clima, datos_finanzas)
     ivv_data = calcular_ivv(datos_clima, datos_finanzas)
 
-    resultado = {
-        "timestamp": datos_clima["timestamp"] if datos_clima else None,
-        "ciudad": ciudad["nombre"],
-        "clima": datos_clima["clima"] if datos_clima else None,
-        "finanzas": datos_finanzas if datos_finanzas else None,
-        "tiempo": datos_tiempo if datos_tiempo else None,
-        "alertas": alertas,
-        "ivv_score": ivv_data["ivv_score"],
-        "nivel_riesgo": ivv_data["nivel_riesgo"],
-        "componentes_ivv": ivv_data["componentes_ivv"],
-        "color": ivv_data["color"],
-        "motivo": ivv_data["motivo"]
-    }
+    resultado = ResultadoCiudad(
+        timestamp=datos_clima.timestamp if datos_clima else None,
+        ciudad=ciudad["nombre"],
+        clima=datos_clima or None,
+        finanzas=datos_finanzas or None,
+        tiempo=datos_tiempo or None,
+        alertas=tuple(alertas),
+        ivv_score=ivv_data["ivv_score"],
+        nivel_riesgo=ivv_data["nivel_riesgo"],
+        componentes_ivv=ivv_data["componentes_ivv"],
+        color=ivv_data["color"],
+        motivo=ivv_data["motivo"],
+        # Coordenadas en el resultado: el mapa del dashboard no necesita leer config.json
+        lat=ciudad.get("lat"),
+        lon=ciudad.get("lon")
+    )
 
     logging.info(f"Ciudad procesada: {ciudad['nombre']} - IVV {ivv_data['ivv_score']}")
     return resultado
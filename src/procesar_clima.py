@@ -2,43 +2,38 @@ import datetime
 import logging
 import json
 from pathlib import Path
+from src.modelos import Clima, Pronostico
+
+# Columna del pronóstico → variable diaria de Open-Meteo (debe pedirse en api_clima)
+VARIABLES_DIARIAS = {
+    "temp_max": "temperature_2m_max",
+    "temp_min": "temperature_2m_min"
+}
 
 
 def transformar_datos_clima(data_api, nombre_ciudad):
-    """Transforma los datos de Open-Meteo a una estructura uniforme."""
+    """Transforma los datos de Open-Meteo a un registro Clima con el pronóstico en columnas."""
     try:
-        clima = {}
-
-        # Datos actuales
-        clima["temperatura_actual"] = data_api["current"]["temperature_2m"]        
-        clima["viento"] = data_api["current"]["wind_speed_10m"]
-        clima["uv"] = data_api["current"]["uv_index"]
-        clima["precipitacion"] = data_api["current"]["precipitation_probability"]
-
-        # Datos diarios (7 días)
-        pronostico_7_dias = []
+        current = data_api["current"]
         daily = data_api["daily"]
 
-        fechas = daily["time"]
-        temp_max = daily["temperature_2m_max"]
-        temp_min = daily["temperature_2m_min"]
-        
-
-        for i in range(len(fechas)):
-            pronostico_7_dias.append({
-                "fecha": fechas[i],
-                "temp_max": temp_max[i],
-                "temp_min": temp_min[i],                
-            })
+        # Datos diarios (7 días): se conservan las columnas de la API, sin un dict por día
+        pronostico = Pronostico.desde_columnas(
+            daily["time"], **{columna: daily[variable] for columna, variable in VARIABLES_DIARIAS.items()}
+        )
+
+        clima = Clima(
+            timestamp=datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z"),
+            temperatura_actual=current["temperature_2m"],
+            viento=current["wind_speed_10m"],
+            uv=current["uv_index"],
+            precipitacion=current["precipitation_probability"],
+            pronostico=pronostico,
+            resumen_horario=data_api.get("resumen_horario")
+        )
 
-        clima["pronostico_7_dias"] = pronostico_7_dias
-        
         logging.info(f"Datos climáticos transformados correctamente para {nombre_ciudad}")
-        return {
-            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z"),            
-            "ciudad": nombre_ciudad,
-            "clima": clima
-        }
+        return clima
 
     except KeyError as e:
         logging.error(f"Campo faltante en datos de clima: {e}")
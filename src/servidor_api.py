@@ -0,0 +1,257 @@
+import json
+import hashlib
+import logging
+import argparse
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from urllib.parse import urlparse, parse_qs, unquote
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from dashboard.utils_dashboard import list_json_results, pick_latest_file, load_run
+from config.config_logs import configurar_logs_generales
+
+HISTORIAL_DEFECTO = 5
+INTERVALO_RECARGA_DEFECTO = 5  # segundos entre revisiones de /data
+MAX_RESPUESTAS_CACHE = 256
+
+
+class Ejecucion:
+    """Una ejecución cargada en memoria e indexada por ciudad y por nivel de riesgo."""
+
+    def __init__(self, path: Path):
+        self.nombre = path.name
+        self.version = f"{path.name}:{path.stat().st_mtime_ns}"
+        self.resultados, self.metadata = load_run(path)
+        self.por_ciudad = {r["ciudad"]: r for r in self.resultados if isinstance(r, dict) and "ciudad" in r}
+        self.por_nivel = {}
+        for r in self.por_ciudad.values():
+            self.por_nivel.setdefault(r.get("nivel_riesgo", "DESCONOCIDO"), []).append(r)
+
+
+class IndiceResultados:
+    """
+    Índice en memoria de la ejecución más reciente y de un historial corto.
+    La recarga construye la ejecución nueva fuera del candado y solo intercambia
+    referencias dentro de él, de modo que las lecturas nunca ven datos a medias.
+    Las respuestas serializadas se guardan en caché por (versión, consulta).
+    """
+
+    def __init__(self, historial=HISTORIAL_DEFECTO):
+        self.historial = historial
+        self._ejecuciones = OrderedDict()  # nombre -> Ejecucion, de la más antigua a la más reciente
+        self._respuestas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def precargar(self):
+        """
+        Carga al arrancar las últimas `historial` ejecuciones de /data, de la más antigua a la
+        más reciente. Las que no se pueden reconstruir (p. ej. un delta sin su base) se omiten.
+        """
+        ejecuciones = []
+        for ruta in list_json_results()[-self.historial:]:
+            try:
+                ejecuciones.append(Ejecucion(ruta))
+            except (ValueError, OSError) as e:
+                logging.error(f"No se pudo cargar {ruta.name} en el índice de resultados: {e}")
+
+        with self._lock:
+            for ejecucion in ejecuciones:
+                self._ejecuciones[ejecucion.nombre] = ejecucion
+
+        logging.info(f"Índice de resultados precargado: {len(ejecuciones)} ejecuciones")
+
+    def refrescar(self):
+        """Carga la ejecución más reciente de /data si aún no está indexada. Retorna True si cambió."""
+        ultimo = pick_latest_file(list_json_results())
+        if ultimo is None:
+            return False
+
+        version = f"{ultimo.name}:{ultimo.stat().st_mtime_ns}"
+        actual = self._ejecuciones.get(ultimo.name)
+        if actual is not None and actual.version == version:
+            return False
+
+        ejecucion = Ejecucion(ultimo)
+
+        with self._lock:
+            self._ejecuciones.pop(ejecucion.nombre, None)
+            self._ejecuciones[ejecucion.nombre] = ejecucion
+            while len(self._ejecuciones) > self.historial:
+                self._ejecuciones.popitem(last=False)
+
+        logging.info(f"Índice de resultados actualizado: {ejecucion.nombre} ({len(ejecucion.por_ciudad)} ciudades)")
+        return True
+
+    def ejecucion(self, nombre=None):
+        """Ejecución por nombre, o la más reciente si no se indica."""
+        with self._lock:
+            if not self._ejecuciones:
+                return None
+            if nombre is None:
+                return next(reversed(self._ejecuciones.values()))
+            return self._ejecuciones.get(nombre)
+
+    def nombres(self):
+        with self._lock:
+            return list(reversed(self._ejecuciones))
+
+    def etag(self, ejecucion, consulta):
+        digest = hashlib.md5(f"{ejecucion.version}|{consulta}".encode("utf-8")).hexdigest()
+        return f'"{digest}"'
+
+    def respuesta(self, ejecucion, consulta, construir):
+        """Cuerpo JSON (bytes) de una consulta, serializado una sola vez por versión."""
+        clave = (ejecucion.version, consulta)
+        with self._lock:
+            cuerpo = self._respuestas.get(clave)
+            if cuerpo is not None:
+                self._respuestas.move_to_end(clave)
+                return cuerpo
+
+        cuerpo = json.dumps(construir(), ensure_ascii=False).encode("utf-8")
+
+        with self._lock:
+            self._respuestas[clave] = cuerpo
+            while len(self._respuestas) > MAX_RESPUESTAS_CACHE:
+                self._respuestas.popitem(last=False)
+        return cuerpo
+
+
+def filtrar(ejecucion, ciudad=None, nivel=None):
+    """Resultados de una ejecución filtrados por ciudad y/o nivel de riesgo (búsquedas por índice)."""
+    if ciudad is not None:
+        resultado = ejecucion.por_ciudad.get(ciudad)
+        candidatos = [resultado] if resultado else []
+        if nivel is not None:
+            candidatos = [r for r in candidatos if r.get("nivel_riesgo", "DESCONOCIDO") == nivel]
+        return candidatos
+    if nivel is not None:
+        return ejecucion.por_nivel.get(nivel, [])
+    return ejecucion.resultados
+
+
+class ManejadorAPI(BaseHTTPRequestHandler):
+    """
+    Endpoints de solo lectura:
+    - GET /resultados?ciudad=...&nivel_riesgo=...&ejecucion=...
+    - GET /ciudades/<nombre>?ejecucion=...
+    - GET /ejecuciones
+    - GET /salud
+    """
+
+    indice = None  # IndiceResultados compartido, asignado al crear el servidor
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parametros = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+        if url.path == "/salud":
+            return self._enviar_json(200, {"estado": "ok", "ejecuciones": self.indice.nombres()})
+        if url.path == "/ejecuciones":
+            return self._enviar_json(200, {"ejecuciones": self.indice.nombres()})
+
+        ejecucion = self.indice.ejecucion(parametros.get("ejecucion"))
+        if ejecucion is None:
+            return self._enviar_json(404, {"error": "No hay resultados disponibles para la ejecución solicitada."})
+
+        if url.path == "/resultados":
+            ciudad, nivel = parametros.get("ciudad"), parametros.get("nivel_riesgo")
+
+            def construir():
+                return {
+                    "ejecucion": ejecucion.nombre,
+                    "metadata": {k: v for k, v in ejecucion.metadata.items() if k not in ("ciudades",)},
+                    "resultados": filtrar(ejecucion, ciudad, nivel)
+                }
+        elif url.path.startswith("/ciudades/"):
+            ciudad = unquote(url.path.removeprefix("/ciudades/"))
+            if ciudad not in ejecucion.por_ciudad:
+                return self._enviar_json(404, {"error": f"Ciudad no encontrada: {ciudad}"})
+
+            def construir():
+                return {"ejecucion": ejecucion.nombre, "resultado": ejecucion.por_ciudad[ciudad]}
+        else:
+            return self._enviar_json(404, {"error": f"Ruta no encontrada: {url.path}"})
+
+        consulta = f"{url.path}?{url.query}"
+        etag = self.indice.etag(ejecucion, consulta)
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        self._enviar(200, self.indice.respuesta(ejecucion, consulta, construir), etag)
+
+    def _enviar_json(self, codigo, datos):
+        self._enviar(codigo, json.dumps(datos, ensure_ascii=False).encode("utf-8"))
+
+    def _enviar(self, codigo, cuerpo, etag=None):
+        self.send_response(codigo)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, formato, *args):
+        logging.debug(f"API {self.address_string()} - {formato % args}")
+
+
+def _vigilar_datos(indice, intervalo, detener):
+    """Revisa /data periódicamente y recarga el índice cuando aparece una ejecución nueva."""
+    while not detener.wait(intervalo):
+        try:
+            indice.refrescar()
+        except Exception as e:
+            logging.error(f"No se pudo recargar el índice de resultados: {e}")
+
+
+def crear_servidor(host, puerto, historial=HISTORIAL_DEFECTO, intervalo=INTERVALO_RECARGA_DEFECTO):
+    """Crea el servidor HTTP con su índice cargado y el hilo de recarga en caliente."""
+    indice = IndiceResultados(historial)
+    indice.precargar()
+    try:
+        indice.refrescar()
+    except Exception as e:
+        logging.error(f"No se pudo cargar la ejecución más reciente: {e}")
+
+    manejador = type("ManejadorAPIConIndice", (ManejadorAPI,), {"indice": indice})
+    servidor = ThreadingHTTPServer((host, puerto), manejador)
+    servidor.indice = indice
+
+    detener = threading.Event()
+    hilo = threading.Thread(target=_vigilar_datos, args=(indice, intervalo, detener), daemon=True)
+    hilo.start()
+    servidor.detener_vigilancia = detener
+    return servidor
+
+
+def _config_servidor():
+    ruta_config = Path(__file__).parent.parent / "config" / "config.json"
+    with open(ruta_config, "r", encoding="utf-8") as f:
+        return json.load(f).get("servidor_api", {})
+
+
+if __name__ == "__main__":
+    config = _config_servidor()
+    parser = argparse.ArgumentParser(description="API local de solo lectura sobre los últimos resultados.")
+    parser.add_argument("--host", default=config.get("host", "127.0.0.1"))
+    parser.add_argument("--puerto", type=int, default=config.get("puerto", 8765))
+    parser.add_argument("--historial", type=int, default=config.get("historial", HISTORIAL_DEFECTO))
+    parser.add_argument("--intervalo", type=float, default=config.get("intervalo_recarga", INTERVALO_RECARGA_DEFECTO))
+    args = parser.parse_args()
+
+    configurar_logs_generales()
+    servidor = crear_servidor(args.host, args.puerto, args.historial, args.intervalo)
+    logging.info(f"🛰️ API de resultados escuchando en http://{args.host}:{args.puerto}")
+
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        logging.info("API de resultados detenida.")
+    finally:
+        servidor.detener_vigilancia.set()
+        servidor.server_close()
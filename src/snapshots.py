@@ -0,0 +1,123 @@
+import os
+import json
+import hashlib
+import logging
+from pathlib import Path
+
+DIR_DATA = Path(__file__).parent.parent / "data"
+RUTA_ESTADO = DIR_DATA / "estado_snapshots.json"
+PREFIJO = "resultado_general_"
+
+# Cada cuántas ejecuciones se escribe un snapshot completo (el resto son deltas)
+COMPLETO_CADA_DEFECTO = 12
+
+
+def huella_resultado(resultado):
+    """
+    Huella (md5) del resultado de una ciudad sin los campos que cambian en cada ejecución
+    aunque los datos sean los mismos (timestamp y hora local).
+    """
+    estable = {k: v for k, v in resultado.items() if k != "timestamp"}
+    if isinstance(estable.get("tiempo"), dict):
+        estable["tiempo"] = {k: v for k, v in estable["tiempo"].items() if k != "hora_local"}
+
+    contenido = json.dumps(estable, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.md5(contenido.encode("utf-8")).hexdigest()
+
+
+def escribir_atomico(ruta, datos, **opciones_json):
+    """
+    Escribe JSON en un temporal oculto del mismo directorio (.<nombre>.tmp, que no coincide
+    con el patrón resultado_general_*.json) y lo renombra con os.replace: quien lea la
+    ruta ve el archivo anterior o el nuevo completo, nunca uno a medio escribir.
+    """
+    temporal = ruta.with_name(f".{ruta.name}.tmp")
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(datos, f, ensure_ascii=False, **opciones_json)
+    os.replace(temporal, ruta)
+
+
+def cargar_estado():
+    """Estado del último snapshot escrito: nombres de archivo y huellas por ciudad."""
+    if RUTA_ESTADO.exists():
+        with open(RUTA_ESTADO, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {"ultimo": None, "base": None, "deltas_desde_base": 0, "huellas": {}}
+
+
+def detectar_cambios(resultados, estado):
+    """
+    Compara los resultados con las huellas de la ejecución anterior.
+    Retorna {"huellas": {ciudad: huella}, "cambiadas": [...], "eliminadas": [...]}.
+    """
+    huellas = {r["ciudad"]: huella_resultado(r) for r in resultados}
+    previas = estado["huellas"]
+    return {
+        "huellas": huellas,
+        "cambiadas": [ciudad for ciudad, huella in huellas.items() if previas.get(ciudad) != huella],
+        "eliminadas": [ciudad for ciudad in previas if ciudad not in huellas]
+    }
+
+
+def guardar_snapshot(resultados, timestamp, completo_cada=COMPLETO_CADA_DEFECTO,
+                     estado=None, cambios=None, metadata_extra=None):
+    """
+    Guarda la ejecución como snapshot completo o como delta respecto a la anterior.
+
+    - Completo: {"metadata": {"tipo": "completo", ...}, "resultados": [todas las ciudades]}
+    - Delta: {"metadata": {"tipo": "delta", "base": ..., "anterior": ..., ...},
+              "resultados": [solo las ciudades que cambiaron]}
+    En ambos casos metadata["ciudades"] guarda el orden completo de ciudades de la ejecución
+    y metadata["cambiadas"] las que difieren de la ejecución anterior.
+    Se escribe un completo si no hay anterior, si ya se acumularon `completo_cada` deltas
+    o si el archivo anterior ya no existe. `estado` y `cambios` pueden venir ya calculados
+    (cargar_estado / detectar_cambios). Retorna (ruta, metadata, nuevo_estado), para que
+    quien mantenga el estado en memoria no tenga que volver a leerlo del disco.
+    """
+    if estado is None:
+        estado = cargar_estado()
+    if cambios is None:
+        cambios = detectar_cambios(resultados, estado)
+    huellas, cambiadas = cambios["huellas"], cambios["cambiadas"]
+
+    nombre = f"{PREFIJO}{timestamp}.json"
+    anterior = estado["ultimo"]
+    es_completo = (
+        anterior is None
+        or anterior == nombre  # misma marca de tiempo: un delta sobre sí mismo no se podría reconstruir
+        or not (DIR_DATA / anterior).exists()
+        or completo_cada <= 1
+        or estado["deltas_desde_base"] + 1 >= completo_cada
+    )
+
+    metadata = {
+        "tipo": "completo" if es_completo else "delta",
+        "base": nombre if es_completo else estado["base"],
+        "anterior": anterior,
+        "ciudades": list(huellas),
+        "cambiadas": cambiadas,
+        "eliminadas": cambios["eliminadas"],
+        **(metadata_extra or {})
+    }
+    if es_completo:
+        contenido = resultados
+    else:
+        set_cambiadas = set(cambiadas)
+        contenido = [r for r in resultados if r["ciudad"] in set_cambiadas]
+
+    ruta = DIR_DATA / nombre
+    escribir_atomico(ruta, {"metadata": metadata, "resultados": contenido}, indent=4)
+
+    nuevo_estado = {
+        "ultimo": nombre,
+        "base": metadata["base"],
+        "deltas_desde_base": 0 if es_completo else estado["deltas_desde_base"] + 1,
+        "huellas": huellas
+    }
+    escribir_atomico(RUTA_ESTADO, nuevo_estado)
+
+    logging.info(
+        f"Snapshot {metadata['tipo']} guardado en {nombre}: "
+        f"{len(cambiadas)} de {len(resultados)} ciudades cambiaron"
+    )
+    return ruta, metadata, nuevo_estado